@@ -47,13 +47,52 @@ function renderMonthOptions(){
   sel.onchange=async()=>{ state.selectedMonth=sel.value; await rebuildFilters(); renderList(); };
 }
 
-async function loadMonthData(monthKey){
+// index.files 记录了内容哈希与预压缩文件：带哈希的 URL 可以放心走缓存，支持时优先下载 .gz
+async function fetchJsonFile(path, meta){
+  if(!meta) {
+    const r=await fetch(path,{cache:"no-store"});
+    return r.ok? await r.json(): null;
+  }
+  const v=`?v=${meta.sha256.slice(0,12)}`;
+  if(meta.gz && typeof DecompressionStream!=="undefined"){
+    try{
+      const r=await fetch(`${path}.gz${v}`);
+      if(r.ok){
+        const stream=r.body.pipeThrough(new DecompressionStream("gzip"));
+        return JSON.parse(await new Response(stream).text());
+      }
+    }catch(e){ /* 回退到未压缩文件 */ }
+  }
+  const r=await fetch(`${path}${v}`);
+  return r.ok? await r.json(): null;
+}
+
+// 月份数据：{items, sources, pending}。分段月份（index.files[月份].segments）先取 manifest，
+// 只加载最新一段，其余段在 pending 中，滚到列表底部时再逐段加载
+async function openMonth(monthKey){
   if(state.cache[monthKey]) return state.cache[monthKey];
   const [y,m]=monthKey.split("-");
-  const r=await fetch(`./data/${y}/${m}.json`,{cache:"no-store"});
-  const data=r.ok? await r.json(): [];
-  state.cache[monthKey]=data; 
-  return data;
+  const meta=(state.index.files||{})[monthKey];
+  let entry;
+  if(meta && meta.segments){
+    const manifest=(await fetchJsonFile(`./data/${y}/${m}/manifest.json`, meta)) || {segments:[]};
+    const pending=(manifest.segments||[]).map(seg=>({path:`./data/${y}/${m}/${seg.file}`, meta:seg}));
+    entry={items:[], sources:manifest.sources||null, pending};
+    if(pending.length) await loadNextSegment(entry);
+  } else {
+    const items=(await fetchJsonFile(`./data/${y}/${m}.json`, meta)) || [];
+    entry={items, sources:null, pending:[]};
+  }
+  state.cache[monthKey]=entry;
+  return entry;
+}
+
+async function loadNextSegment(entry){
+  const seg=entry.pending.shift();
+  if(!seg) return [];
+  const items=(await fetchJsonFile(seg.path, seg.meta)) || [];
+  entry.items=entry.items.concat(items);
+  return items;
 }
 
 function showSkeleton(n=10){
@@ -92,8 +131,8 @@ function buildCard(it){
 }
 
 async function rebuildFilters(){
-  const data = await loadMonthData(state.selectedMonth);
-  const set = new Set(data.map(it=>it.source));
+  const entry = await openMonth(state.selectedMonth);
+  const set = new Set(entry.sources || entry.items.map(it=>it.source));
   state.availableSources = Array.from(set).sort();
   if(state.selectedSources.size===0) state.selectedSources = new Set(state.availableSources);
   const box=document.getElementById("filters");
@@ -111,14 +150,10 @@ async function rebuildFilters(){
   });
 }
 
-async function renderList(){
-  showSkeleton(10);
-  const list=document.getElementById("list");
-  const data=await loadMonthData(state.selectedMonth);
+function visibleItems(items){
   const q=(state.query||"").trim().toLowerCase();
-
   // 关键：前端只渲染有站内全文的条目
-  const filtered=data
+  return items
     .filter(it=> it.can_publish_fulltext && ((it.content_html && it.content_html.length>0) || (it.content_text && it.content_text.length>0)))
     .filter(it=> state.selectedSources.size===0 || state.selectedSources.has(it.source))
     .filter(it=>{
@@ -126,14 +161,53 @@ async function renderList(){
       const hay=(it.title+" "+(it.author||"")).toLowerCase();
       return hay.includes(q);
     });
+}
+
+async function renderList(){
+  showSkeleton(10);
+  const list=document.getElementById("list");
+  const month=state.selectedMonth;
+  const entry=await openMonth(month);
+  const filtered=visibleItems(entry.items);
 
   hideSkeleton();
   list.innerHTML="";
-  if(filtered.length===0){
+  filtered.forEach(it=>list.appendChild(buildCard(it)));
+  if(entry.pending.length){
+    appendMoreButton(list, entry, month);
+  } else if(filtered.length===0){
     list.innerHTML=`<div class="card"><div class="meta">该月暂无可站内阅读的文章</div></div>`;
-    return;
   }
-  filtered.forEach(it=>list.appendChild(buildCard(it)));
+}
+
+// 分段月份的“加载更早”：点击或滚动到可见时加载下一段，新条目追加在按钮之前
+function appendMoreButton(list, entry, month){
+  const more=document.createElement("div");
+  more.className="card";
+  more.innerHTML=`<div class="meta">加载更早的文章…</div>`;
+  list.appendChild(more);
+  let busy=false;
+  const load=async()=>{
+    if(busy) return;
+    busy=true;
+    const items=await loadNextSegment(entry);
+    // 期间切换了月份或重新渲染过列表：数据已进缓存，下次渲染时显示
+    if(state.selectedMonth!==month || !more.isConnected){ if(observer) observer.disconnect(); return; }
+    visibleItems(items).forEach(it=>list.insertBefore(buildCard(it), more));
+    busy=false;
+    if(!entry.pending.length){
+      if(observer) observer.disconnect();
+      more.remove();
+      if(!list.children.length) list.innerHTML=`<div class="card"><div class="meta">该月暂无可站内阅读的文章</div></div>`;
+    } else if(observer && more.getBoundingClientRect().top<window.innerHeight){
+      load();
+    }
+  };
+  more.addEventListener("click", load);
+  const observer=(typeof IntersectionObserver!=="undefined")
+    ? new IntersectionObserver(es=>{ if(es.some(e=>e.isIntersecting)) load(); }, {rootMargin:"600px"})
+    : null;
+  if(observer) observer.observe(more);
 }
 
 /* Reader */
@@ -155,6 +229,9 @@ function openReader(it){
     const tmp=document.createElement("div");
     tmp.innerHTML=it.content_html;
     tmp.querySelectorAll("script,style,noscript,iframe").forEach(n=>n.remove());
+    // 数据文件中的正文已精简掉这些属性，渲染时补上
+    tmp.querySelectorAll("a[href]").forEach(a=>{ a.target="_blank"; a.rel="noopener noreferrer"; });
+    tmp.querySelectorAll("img").forEach(img=>{ img.loading="lazy"; img.decoding="async"; });
     body.appendChild(tmp);
   } else if(it.content_text){
     it.content_text.split(/\n{2,}/).forEach(p=>{ const el=document.createElement("p"); el.textContent=p.trim(); body.appendChild(el); });
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+__main__.py
+统一命令行入口：python -m scripts <命令> [参数]，参数与对应模块的 python -m scripts.xxx 相同。
+
+- 命令对应的模块在分派时才导入；requests / bs4 / trafilatura / readability / feedparser
+  都在用到它们的函数内导入，prune、index 等命令不加载它们
+- run-all 在一个进程内依次运行多个阶段：存储对象（含只加载一次的去重集合）、
+  HTTP Session（scripts.utils.http_session）与已导入的模块在各阶段间共用；
+  阶段参数用各自的环境变量配置；抓取与 feed 统计（FETCH_STATS / READER_STATS）在每个阶段开始前清零
+- 各命令的启动耗时：python -m scripts bench startup
+"""
+import os, sys, time, argparse, importlib
+
+def run_index(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m scripts index", description="折叠入库日志后全量重建 index.json")
+    ap.parse_args(argv)
+    from scripts import journal
+    from scripts.utils import INDEX_FILE, load_json, update_index_indexfile
+    journal.compact()
+    update_index_indexfile(None)
+    index = load_json(INDEX_FILE, {})
+    print(f"[index] months={len(index.get('months') or [])} items={sum((index.get('counts') or {}).values())}")
+    return 0
+
+# 命令 -> ("模块:函数" 或函数, 说明)；模块在分派时才导入
+COMMANDS = {
+    "daily":     ("scripts.fetch_daily:main", "日更抓取（RSS / Sitemap 兜底 / GitHub 仓库）"),
+    "backfill":  ("scripts.backfill:main", "按 Sitemap 回填历史文章"),
+    "prune":     ("scripts.prune:main", "删除没有站内全文的条目"),
+    "reextract": ("scripts.reextract:main", "对已入库条目重新抽取全文"),
+    "refresh":   ("scripts.refresh:main", "复查近期文章是否有更新"),
+    "index":     (run_index, "全量重建 index.json"),
+    "bench":     ("scripts.bench:main", "微基准（含各命令启动耗时）"),
+}
+RUN_ALL_STAGES = [s.strip() for s in (os.getenv("RUN_ALL_STAGES") or "daily,refresh,index").split(",") if s.strip()]
+
+def _resolve(target):
+    if callable(target):
+        return target
+    mod, func = target.split(":")
+    return getattr(importlib.import_module(mod), func)
+
+def reset_stage_stats():
+    """清零进程级统计，各阶段的 [fetch] / [feeds] 报告与 run_stats.json 只含本阶段的计数。"""
+    from scripts.utils import reset_fetch_stats
+    reset_fetch_stats()
+    # feed_reader 未导入时没有可清零的计数，也不为此提前导入
+    if "scripts.feed_reader" in sys.modules:
+        sys.modules["scripts.feed_reader"].reset_reader_stats()
+
+def run_stage(name, argv=()):
+    """运行单个命令；argparse 的 SystemExit 转为返回码。"""
+    reset_stage_stats()
+    try:
+        return _resolve(COMMANDS[name][0])(list(argv)) or 0
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+
+def run_all(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m scripts run-all",
+                                 description="在一个进程内依次运行多个阶段，共用存储、去重集合与 HTTP Session")
+    ap.add_argument("stages", nargs="*", metavar="stage",
+                    help=f"{', '.join(sorted(set(COMMANDS) - {'run-all'}))}（默认 RUN_ALL_STAGES={','.join(RUN_ALL_STAGES)}）")
+    ap.add_argument("--keep-going", action="store_true", help="某阶段失败后继续运行后续阶段")
+    args = ap.parse_args(argv)
+    stages = args.stages or RUN_ALL_STAGES
+    unknown = [s for s in stages if s not in COMMANDS or s == "run-all"]
+    if unknown:
+        ap.error(f"unknown stage: {', '.join(unknown)}")
+
+    rc, timings = 0, []
+    for name in stages:
+        print(f"[run-all] >>> {name}")
+        t0 = time.time()
+        try:
+            code = run_stage(name)
+        except Exception as e:
+            if not args.keep_going:
+                raise
+            print(f"[run-all] {name} failed: {e}")
+            code = 1
+        timings.append((name, time.time() - t0, code))
+        rc = rc or code
+        if code and not args.keep_going:
+            break
+    print("[run-all] " + "  ".join(f"{name}={secs:.1f}s" + (f"(rc={code})" if code else "") for name, secs, code in timings))
+    return rc
+
+COMMANDS["run-all"] = (run_all, "在一个进程内依次运行多个阶段")
+
+def usage():
+    lines = ["用法：python -m scripts <命令> [参数]（python -m scripts <命令> --help 查看命令参数）", ""]
+    lines += [f"  {name:<10} {desc}" for name, (_, desc) in COMMANDS.items()]
+    return "\n".join(lines)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return 0 if argv else 2
+    cmd, rest = argv[0], argv[1:]
+    if cmd not in COMMANDS:
+        print(f"unknown command: {cmd}\n\n{usage()}", file=sys.stderr)
+        return 2
+    return _resolve(COMMANDS[cmd][0])(rest) or 0
+
+if __name__ == "__main__":
+    sys.exit(main())
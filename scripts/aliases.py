@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+aliases.py
+跳转/别名 URL 映射，避免同一篇文章因入口 URL 不同而重复抓取、重复入库：
+- 抓全文时记录跳转后的最终 URL、<link rel=canonical>、og:url，
+  写入 docs/data/aliases.json（别名 id -> 规范 id）
+- 新条目改用规范 URL 与 id 入库；入库前的去重预检查经别名表解析，已知文章不再抓取
+- canonical/og:url 与最终 URL 不在同一站点时不采信；路径不像文章（首页、登录/订阅/同意页等中间页）、
+  或已有超过 ALIAS_MAX_FANIN 个别名指向它的规范 URL 也不采信，避免把多篇文章并成一个 id
+- 别名只在条目真正入库后才写入（adopt_canonical 只返回待记录的别名，入库成功后由 commit_aliases 写入）
+- 一次性清理：python -m scripts.aliases collapse [--apply]，把月份文件中已有的别名重复合并为一条
+"""
+import os, re, sys, argparse
+from collections import Counter
+from urllib.parse import urlparse
+from scripts.utils import DATA_ROOT, load_json, save_json, sha1, canonicalize_url, domain_of
+from scripts.store import get_store
+from scripts.neardup import fingerprints_path
+
+ALIASES_NAME = "aliases.json"
+MAX_HOPS = 8
+# 同一规范 id 最多接受多少个别名；超过时视为多篇文章共用的中间页（登录、同意、付费墙等）
+ALIAS_MAX_FANIN = int(os.getenv("ALIAS_MAX_FANIN") or 4)
+# 路径中出现这些段时不是文章页
+NON_ARTICLE_SEGMENTS = {
+    "login", "signin", "sign-in", "signup", "sign-up", "register", "account", "auth", "oauth", "sso",
+    "subscribe", "subscription", "paywall", "consent", "cookies", "gdpr", "privacy", "captcha",
+    "unsupported", "unsupported-browser", "browser", "error", "404", "search", "tag", "tags", "category",
+}
+_ARTICLE_HINT = re.compile(r"\d{3,}|[a-z0-9]+[-_][a-z0-9]+")
+
+def aliases_path(root=None):
+    return os.path.join(root or DATA_ROOT, ALIASES_NAME)
+
+def load_aliases(root=None):
+    return load_json(aliases_path(root), {})
+
+def save_aliases(amap, root=None):
+    save_json(aliases_path(root), {k: amap[k] for k in sorted(amap)}, compact=True)
+
+def resolve(amap, item_id):
+    seen = set()
+    while item_id in amap and item_id not in seen and len(seen) < MAX_HOPS:
+        seen.add(item_id)
+        item_id = amap[item_id]
+    return item_id
+
+def add_alias(amap, alias_id, canonical_id):
+    canonical_id = resolve(amap, canonical_id)
+    if alias_id != canonical_id:
+        amap[alias_id] = canonical_id
+
+def commit_aliases(amap, alias_ids, canonical_id):
+    """条目入库后写入 adopt_canonical 返回的别名。"""
+    for a in alias_ids:
+        add_alias(amap, a, canonical_id)
+
+def crowded_targets(amap):
+    """别名数超过 ALIAS_MAX_FANIN 的规范 id（多半是以前误记的中间页）。"""
+    return {cid for cid, n in Counter(amap.values()).items() if n > ALIAS_MAX_FANIN}
+
+class KnownIds:
+    """去重集合的只读视图：id 本身或其规范 id 已入库即视为已知；别名过多的规范 id 不作数。"""
+    def __init__(self, dedup, amap):
+        self.dedup, self.amap = dedup, amap
+        self.crowded = crowded_targets(amap)
+
+    def __contains__(self, item_id):
+        if item_id in self.dedup:
+            return True
+        if item_id not in self.amap:
+            return False
+        cid = resolve(self.amap, item_id)
+        return cid in self.dedup and cid not in self.crowded
+
+def _same_site(a, b):
+    da, db = domain_of(a), domain_of(b)
+    return bool(da and db) and (da == db or da.endswith("." + db) or db.endswith("." + da))
+
+def looks_like_article(url):
+    """路径像文章页：不是首页，不含登录/订阅/同意等段，且有多级路径、连字符 slug 或数字 id。"""
+    segs = [s.lower() for s in urlparse(url).path.split("/") if s]
+    if not segs or any(s.rsplit(".", 1)[0] in NON_ARTICLE_SEGMENTS for s in segs):
+        return False
+    return len(segs) >= 2 or bool(_ARTICLE_HINT.search(segs[-1]))
+
+def _acceptable(url, amap):
+    if not (url.startswith("http") and looks_like_article(url)):
+        return False
+    cid = resolve(amap, sha1(canonicalize_url(url)))
+    return sum(1 for v in amap.values() if v == cid) < ALIAS_MAX_FANIN
+
+def canonical_url_for(item_url, data, amap=None):
+    """
+    从全文抽取结果中选出规范 URL：canonical/og:url 优先（须与最终 URL 同站），其次最终 URL；
+    两者都须像文章页且别名未满 ALIAS_MAX_FANIN，否则返回空串（沿用入口 URL）。
+    """
+    amap = {} if amap is None else amap
+    final = data.get("final_url") or item_url
+    canon = data.get("canonical_url") or ""
+    if canon.startswith("http") and _same_site(canon, final) and _acceptable(canon, amap):
+        return canon
+    return final if _acceptable(final, amap) else ""
+
+def adopt_canonical(item, data, amap):
+    """
+    让 item 改用规范 URL 与 id，返回待记录的别名 id 列表（入口 URL、最终 URL）。
+    不改动 amap：条目入库后再用 commit_aliases 写入，未入库的条目不留下别名。
+    """
+    canon = canonical_url_for(item["url"], data, amap)
+    if not canon:
+        return []
+    canon = canonicalize_url(canon)
+    cid = sha1(canon)
+    pending = [item["id"]]
+    for u in (data.get("final_url"), data.get("canonical_url")):
+        if u and u.startswith("http"):
+            pending.append(sha1(canonicalize_url(u)))
+    item["id"], item["url"] = cid, canon
+    return [a for a in dict.fromkeys(pending) if a != cid]
+
+def collapse(amap, root=None, apply=False):
+    """
+    把解析到同一规范 id 的已入库条目合并为一条（按分片合并同一规则挑选保留版本），
+    返回 ({规范 id: [被合并的 id]}, 写回的条目数)。
+    """
+    from scripts.shard import pick
+    store = get_store(root)
+    groups = {}
+    for it in store.iter_items():
+        # 规范化规则变化后，按当前规则重新计算的 id 也视为别名
+        uid = sha1(canonicalize_url(it["url"]))
+        if uid != it["id"]:
+            add_alias(amap, it["id"], uid)
+        groups.setdefault(resolve(amap, it["id"]), []).append(it)
+
+    merged, winners = {}, []
+    for cid, members in sorted(groups.items()):
+        if len(members) < 2:
+            continue
+        best = members[0]
+        for it in members[1:]:
+            best = pick(best, it)
+        # 规范 URL 本身在库中时沿用它的 id/url，内容取裁决胜出的版本
+        anchor = next((it for it in members if it["id"] == cid), best)
+        keep = dict(best, id=anchor["id"], url=anchor["url"])
+        losers = sorted(it["id"] for it in members if it["id"] != keep["id"])
+        for i in losers:
+            add_alias(amap, i, keep["id"])
+        merged[keep["id"]] = losers
+        winners.append(keep)
+    if not apply or not merged:
+        return merged, 0
+
+    gone = {i for ids in merged.values() for i in ids}
+    # 指向被合并条目的近重复链接改指向保留的条目
+    relinked = [dict(it, duplicate_of=resolve(amap, it["duplicate_of"]))
+                for it in store.iter_items() if it.get("duplicate_of") in gone and it["id"] not in gone]
+    store.delete(gone)
+    store.put(winners + relinked)
+    store.flush()
+    fps = load_json(fingerprints_path(root), {})
+    if gone & set(fps):
+        save_json(fingerprints_path(root), {k: v for k, v in sorted(fps.items()) if k not in gone}, compact=True)
+    return merged, len(winners) + len(relinked)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m scripts.aliases")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_col = sub.add_parser("collapse", help="合并月份文件中解析到同一规范 URL 的重复条目")
+    p_col.add_argument("--apply", action="store_true", help="写回存储与 aliases.json（默认只列出）")
+    sub.add_parser("stats", help="别名表统计")
+    args = ap.parse_args(argv)
+
+    amap = load_aliases()
+    if args.cmd == "stats":
+        crowded = crowded_targets(amap)
+        print(f"[aliases] aliases={len(amap)} canonical={len(set(amap.values()))} crowded={len(crowded)}")
+        for cid in sorted(crowded):
+            print(f"  crowded: {cid} <- {sum(1 for v in amap.values() if v == cid)} aliases")
+        return 0
+    before = dict(amap)
+    merged, written = collapse(amap, apply=args.apply)
+    for cid, ids in merged.items():
+        print(f"{cid} <- {', '.join(ids)}")
+    print(f"[aliases] groups={len(merged)} removed={sum(len(v) for v in merged.values())} written={written} aliases={len(amap)}")
+    if args.apply and amap != before:
+        save_aliases(amap)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,28 @@
 # -*- coding: utf-8 -*-
-import os, sys, time
+import os, sys, time, argparse
 from datetime import datetime, timezone
-from dateutil import parser as dtparser
-from scripts.config import SOURCES, START_DATE_ISO
+from scripts.config import START_DATE_ISO
 from scripts.utils import (
-    collect_from_sitemap_index, extract_meta, load_dedup, save_dedup,
-    add_item_if_new, make_item, to_iso, update_index_indexfile
+    collect_from_sitemap_index, extract_meta, FETCH_STATS, report_fetch_stats,
+    add_item_if_new, make_item, to_iso, sha1, canonicalize_url
 )
 from scripts.connectors.fulltext import extract_fulltext
+from scripts import journal
+from scripts.store import get_store
+from scripts.neardup import load_fingerprints
+from scripts.aliases import KnownIds, load_aliases, adopt_canonical, commit_aliases
+from scripts.refresh import load_validators, record_validators
+from scripts.fetch_daily import save_state, snapshot_state
+from scripts.shard import parse_shard, select_sources, partial_root, reset_partial, write_partial
 
-def try_fill_fulltext(item):
+def try_fill_fulltext(item, aliases=None, validators=None):
+    """抓全文补全 item；返回 (item, 待记录的别名 id)，别名在条目入库后再写入别名表。"""
+    pending = []
     try:
         data = extract_fulltext(item["url"])
-        if not data: return item
+        if not data: return item, pending
+        if aliases is not None: pending = adopt_canonical(item, data, aliases)
+        if validators is not None: record_validators(validators, item["id"], data)
         if data.get("title"):        item["title"] = item["title"] or data["title"]
         if data.get("author"):       item["author"] = item["author"] or data["author"]
         if data.get("published_at"): item["published_at"] = data["published_at"]
@@ -23,21 +33,53 @@ def try_fill_fulltext(item):
             item["can_publish_fulltext"] = True
     except Exception as e:
         print(f"Fulltext extract failed: {e}")
-    return item
+    return item, pending
+
+COMMIT_EVERY = int(os.getenv("COMMIT_EVERY") or 120)
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m scripts.backfill")
+    ap.add_argument("--shard", help="i/n：只处理第 i 个分片（从 0 开始），结果写入 partial 目录")
+    ap.add_argument("--out", help="partial 输出目录（默认 partials/shard-i-of-n）")
+    return ap.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    shard = parse_shard(args.shard)
+    out_root = None
+    if shard:
+        out_root = partial_root(shard, args.out)
+        reset_partial(out_root)
+        print(f"[shard {shard[0]}/{shard[1]}] output -> {out_root}")
 
-def main():
     start_iso = (os.getenv("BACKFILL_START") or "").strip() or START_DATE_ISO + "T00:00:00Z"
     end_iso   = (os.getenv("BACKFILL_END") or "").strip()   or to_iso(datetime.now(timezone.utc))
-    dedup = load_dedup()
+    t0 = time.time()
+    if shard:
+        dedup = get_store().known_ids()
+        journal.replay(dedup)
+    else:
+        recovered = journal.compact()
+        if recovered: print(f"[journal] recovered {recovered} items from previous run")
+        dedup = get_store().known_ids()
+    known = set(dedup)
+    fp_index = load_fingerprints()
+    aliases = load_aliases()
+    validators = load_validators()
+    if shard: snapshot_state(out_root, fp_index, aliases, validators)
+    known_view = KnownIds(dedup, aliases)
 
     added = 0
-    for key, conf in SOURCES.items():
+    per_source = {}
+    for key, conf in select_sources(shard).items():
         base = conf.get("sitemap")
         if not base: continue
         print(f"[{conf['display_name']}] Sitemap backfill: {base}")
         rows = collect_from_sitemap_index(base, start_iso, end_iso, polite_delay=0.6) or []
         print(f"  URLs in range: {len(rows)}")
         for (url, lastmod_iso) in rows:
+            # 已入库（含经别名表解析）的条目不再抓取元数据与全文
+            if sha1(canonicalize_url(url)) in known_view: continue
             meta = extract_meta(url)
             title = meta.get("title","") or conf["display_name"]
             author = meta.get("author","")
@@ -46,16 +88,31 @@ def main():
             item = make_item(url, title, conf["display_name"], published, None, author, updated)
 
             # 只保留站内可全文展示的条目
-            item = try_fill_fulltext(item)
+            item, pending = try_fill_fulltext(item, aliases, validators)
             if not (item.get("can_publish_fulltext") and (item.get("content_html") or item.get("content_text"))):
                 continue
 
-            if add_item_if_new(dedup, item):
+            if add_item_if_new(dedup, item, out_root, fp_index):
+                commit_aliases(aliases, pending, item["id"])
                 added += 1
+                per_source[key] = per_source.get(key, 0) + 1
+                journal.checkpoint(out_root, COMMIT_EVERY, None if shard else dedup, lambda: save_state(out_root, fp_index, aliases, validators))
             time.sleep(0.18)
 
-    save_dedup(dedup)
-    update_index_indexfile()
+    journal.compact(out_root, None if shard else dedup, lambda: save_state(out_root, fp_index, aliases, validators))
+    report_fetch_stats()
+    if shard:
+        write_partial(out_root, dedup - known, {
+            "kind": "backfill",
+            "shard": f"{shard[0]}/{shard[1]}",
+            "sources": sorted(select_sources(shard)),
+            "added": per_source,
+            "total_added": added,
+            "start_iso": start_iso,
+            "end_iso": end_iso,
+            "fetch": dict(FETCH_STATS),
+            "elapsed_sec": round(time.time() - t0, 1),
+        })
     print(f"Backfill done. New items added: {added}")
     return 0
 
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+bench.py
+微基准（本地运行，不联网）：
+  python -m scripts.bench normalize   # URL 规范化 / 日期解析：新实现 vs 原实现
+  python -m scripts.bench serialize   # 月份文件编码/解码耗时与磁盘大小（缩进 vs 紧凑、stdlib vs orjson、gz/br）
+  python -m scripts.bench startup     # python -m scripts 各命令的启动耗时与加载的重模块
+
+基准数据取自 docs/data 中已有的文章，结果一致性会一并校验。
+"""
+import os, re, sys, json, gzip, time, argparse, warnings, subprocess
+from datetime import timezone
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+from scripts.utils import iter_month_keys, load_month, monthly_file, month_dir, load_manifest
+from scripts import normalize
+
+def _timeit(fn, repeat=5):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best
+
+def _row(name, n, legacy, new):
+    speedup = legacy / new if new else float("inf")
+    print(f"  {name:<28} n={n:<6} legacy={legacy * 1e6 / n:8.2f}us  new={new * 1e6 / n:8.2f}us  x{speedup:.1f}")
+
+def _sample_items(limit=None):
+    out = []
+    for (y, m) in iter_month_keys():
+        out.extend(load_month(y, m))
+        if limit and len(out) >= limit:
+            break
+    return out[:limit] if limit else out
+
+# ---- normalize：原实现（逐次 re.sub + dateutil），作为对照 ----
+
+def _legacy_canonicalize_url(u):
+    try:
+        parts = urlparse(u.strip())
+        netloc = re.sub(r"^(m|amp|www)\.", "", parts.netloc.lower())
+        path = re.sub(r"/+$", "", parts.path)
+        path = re.sub(r"/amp/?$", "", path).replace("/amp/", "/")
+        q = [(k, v) for (k, v) in parse_qsl(parts.query, keep_blank_values=True)
+             if k.lower() not in normalize.TRACKING_PARAMS and v.lower() != "amp"]
+        return urlunparse(("https", netloc, path, "", urlencode(q, doseq=True), ""))
+    except Exception:
+        return u
+
+def _legacy_to_iso(dt):
+    from dateutil import parser as dtparser
+    if isinstance(dt, str):
+        dt = dtparser.parse(dt)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).isoformat()
+
+def bench_normalize():
+    items = _sample_items()
+    urls = []
+    for it in items:
+        u = it["url"]
+        urls += [u, u.replace("https://", "https://www.") + "/?utm_source=rss&id=1", u + "/amp/"]
+    dates = []
+    for it in items:
+        for k in ("published_at", "updated_at"):
+            if it.get(k): dates.append(it[k])
+    dates += [
+        "2025-01-31", "2025-01-31T08:00:00Z", "2025-01-31 08:00:00.123456+0800",
+        "Fri, 31 Jan 2025 08:00:00 GMT", "Fri, 31 Jan 2025 08:00:00 +0000", "31 Jan 2025 08:00 -0500",
+        "Fri, 31 Jan 2025 08:00:00 EST", "January 31, 2025 8:00 AM",
+    ] * 20
+
+    # 结果一致性
+    bad = [u for u in urls if normalize.canonicalize_url(u) != _legacy_canonicalize_url(u)]
+    bad += [d for d in dates if normalize.to_iso(d) != _legacy_to_iso(d)]
+    print(f"[normalize] urls={len(urls)} dates={len(dates)} mismatches={len(bad)}")
+    for b in bad[:10]:
+        print(f"  MISMATCH: {b!r}")
+
+    def new_urls_cold():
+        normalize.canonicalize_url.cache_clear()
+        normalize.canonicalize_urls(urls)
+    def new_dates_cold():
+        normalize.parse_datetime.cache_clear()
+        normalize.to_iso_many(dates)
+
+    _row("canonicalize_url (cold)", len(urls), _timeit(lambda: [_legacy_canonicalize_url(u) for u in urls]), _timeit(new_urls_cold))
+    _row("canonicalize_url (cached)", len(urls), _timeit(lambda: [_legacy_canonicalize_url(u) for u in urls]), _timeit(lambda: normalize.canonicalize_urls(urls)))
+    _row("to_iso (cold)", len(dates), _timeit(lambda: [_legacy_to_iso(d) for d in dates]), _timeit(new_dates_cold))
+    _row("to_iso (cached)", len(dates), _timeit(lambda: [_legacy_to_iso(d) for d in dates]), _timeit(lambda: normalize.to_iso_many(dates)))
+    return 1 if bad else 0
+
+# ---- serialize：docs/data 月份文件 ----
+
+def bench_serialize(path=None):
+    if path is None:
+        keys = list(iter_month_keys())
+        if not keys:
+            print("[serialize] no month files"); return 0
+        path = monthly_file(*keys[0])
+        manifest = load_manifest(*keys[0])
+        if manifest is not None:
+            # 分段月份取最新的一段
+            path = os.path.join(month_dir(*keys[0]), manifest["segments"][0]["file"])
+    with open(path, "rb") as f:
+        raw = f.read()
+    obj = json.loads(raw)
+    print(f"[serialize] {path}: items={len(obj)} on-disk={len(raw) / 1024:.0f}KB")
+
+    codecs = {
+        "stdlib indent=2": (lambda o: json.dumps(o, ensure_ascii=False, indent=2).encode("utf-8"), json.loads),
+        "stdlib compact": (lambda o: json.dumps(o, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), json.loads),
+    }
+    try:
+        import orjson
+        codecs["orjson indent=2"] = (lambda o: orjson.dumps(o, option=orjson.OPT_INDENT_2), orjson.loads)
+        codecs["orjson compact"] = (lambda o: orjson.dumps(o), orjson.loads)
+    except ImportError:
+        print("  (orjson not installed)")
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        print("  (brotli not installed)")
+
+    base = None
+    for name, (enc, dec) in codecs.items():
+        data = enc(obj)
+        t_enc = _timeit(lambda: enc(obj))
+        t_dec = _timeit(lambda: dec(data))
+        gz = len(gzip.compress(data, compresslevel=9, mtime=0))
+        br = len(brotli.compress(data, quality=11)) if brotli else None
+        base = base or (t_enc, t_dec, len(data))
+        print(f"  {name:<16} encode={t_enc * 1e3:7.1f}ms (x{base[0] / t_enc:.1f})  decode={t_dec * 1e3:7.1f}ms (x{base[1] / t_dec:.1f})  "
+              f"size={len(data) / 1024:6.0f}KB  gz={gz / 1024:5.0f}KB" + (f"  br={br / 1024:5.0f}KB" if br else ""))
+    return 0
+
+# ---- startup：python -m scripts 各命令的启动耗时 ----
+
+STARTUP_COMMANDS = ("daily", "backfill", "prune", "reextract", "refresh", "index", "bench")
+HEAVY_MODULES = ("requests", "bs4", "lxml", "trafilatura", "readability", "feedparser", "dateutil")
+
+def _run_help(cmd, importtime=False):
+    argv = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-m", "scripts", cmd, "--help"]
+    t0 = time.perf_counter()
+    p = subprocess.run(argv, capture_output=True, text=True)
+    return time.perf_counter() - t0, p
+
+def bench_startup(repeat=5):
+    """各命令 `--help` 的进程耗时（取最小值，扣除空解释器启动）与启动时加载的重模块。"""
+    bare = _timeit(lambda: subprocess.run([sys.executable, "-c", "pass"]), repeat)
+    print(f"[startup] bare interpreter {bare * 1e3:.0f}ms")
+    rc = 0
+    for cmd in STARTUP_COMMANDS:
+        wall = min(_run_help(cmd)[0] for _ in range(repeat))
+        _, p = _run_help(cmd, importtime=True)
+        if p.returncode != 0:
+            print(f"  {cmd:<10} FAILED rc={p.returncode}")
+            rc = 1
+            continue
+        # -X importtime：每行 "import time: self | cumulative | name"，顶层模块名不缩进
+        loaded, imports_us = set(), 0
+        for line in p.stderr.splitlines():
+            parts = line.split("|")
+            if len(parts) != 3 or not parts[1].strip().isdigit():
+                continue
+            name = parts[2].rstrip()
+            top = name.strip().split(".")[0]
+            if top in HEAVY_MODULES:
+                loaded.add(top)
+            if not name.startswith("  "):
+                imports_us += int(parts[1])
+        print(f"  {cmd:<10} wall={wall * 1e3:6.0f}ms (+{(wall - bare) * 1e3:4.0f}ms)  imports={imports_us / 1e3:6.0f}ms  "
+              f"heavy={','.join(sorted(loaded)) or '-'}")
+    return rc
+
+BENCHES = {
+    "normalize": bench_normalize,
+    "serialize": bench_serialize,
+    "startup": bench_startup,
+}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m scripts.bench")
+    ap.add_argument("names", nargs="*", help=f"{', '.join(sorted(BENCHES))}（默认全部运行）")
+    args = ap.parse_args(argv)
+    unknown = [n for n in args.names if n not in BENCHES]
+    if unknown:
+        ap.error(f"unknown bench: {', '.join(unknown)}")
+    rc = 0
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # dateutil 对 EST 等时区缩写的告警
+        for name in (args.names or sorted(BENCHES)):
+            rc |= BENCHES[name]()
+    return rc
+
+if __name__ == "__main__":
+    sys.exit(main())
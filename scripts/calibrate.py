@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+calibrate.py
+为每个来源挑选最省的全文抽取档案：
+  python -m scripts.calibrate [source ...] [--sample 5] [--threshold 0.9] [--selector CSS]
+
+- 从已入库的文章中按来源抽样（最近的月份优先），每个 URL 只下载一次
+- 以当前默认档案（trafilatura + readability）的输出为基准，对各候选档案计时，
+  并比较纯文本、正文 HTML 的文字、图片数、元数据（标题/作者/发布时间）的一致程度
+- 质量取各项最小值的样本平均；达到阈值且耗时最少的档案即建议档案，
+  打印成可直接写进 SOURCES[...]["extract"] 的片段
+"""
+import sys, json, time, argparse, warnings
+from collections import Counter
+from bs4 import BeautifulSoup
+from scripts.config import SOURCES, DEFAULT_EXTRACT
+from scripts.utils import fetch_html, report_fetch_stats
+from scripts.store import get_store
+from scripts.connectors.fulltext import extract_from_html
+
+_BOTH = ["trafilatura", "readability"]
+
+def candidates(conf, selector=None):
+    """候选档案：名称 -> 覆盖 DEFAULT_EXTRACT 的字段。第一个是基准（当前默认行为）。"""
+    own = dict(conf.get("extract") or {})
+    opts = {k: own[k] for k in ("trafilatura", "readability", "drop") if k in own}
+    out = {
+        "both": {"engines": _BOTH, "selector": "", **opts},
+        "trafilatura": {"engines": ["trafilatura"], "selector": "", **opts},
+        "readability": {"engines": ["readability"], "selector": "", **opts},
+    }
+    sel = selector or own.get("selector")
+    if sel:
+        out["selector"] = {"engines": [], "selector": sel, **opts}
+        out["selector+trafilatura"] = {"engines": ["trafilatura"], "selector": sel, **opts}
+    return out
+
+def sample_urls(conf, n):
+    """该来源最近的 n 篇文章 URL（跳过近重复条目）。"""
+    store, name, urls = get_store(), conf.get("display_name"), []
+    for key in reversed(store.months()):
+        for it in store.month_items(key):
+            if it.get("source") == name and not it.get("duplicate_of") and it.get("url", "").startswith("http"):
+                urls.append(it["url"])
+                if len(urls) >= n:
+                    return urls
+    return urls
+
+def _words(text):
+    return Counter((text or "").lower().split())
+
+def overlap(a: Counter, b: Counter) -> float:
+    total = sum(a.values()) + sum(b.values())
+    return 1.0 if total == 0 else 2.0 * sum((a & b).values()) / total
+
+def _html_stats(content_html):
+    soup = BeautifulSoup(content_html or "", "html.parser")
+    return _words(soup.get_text(" ")), len(soup.find_all("img"))
+
+def compare(ref, out):
+    ref_words, ref_imgs = _html_stats(ref["content_html"])
+    out_words, out_imgs = _html_stats(out["content_html"])
+    fields = [k for k in ("title", "author", "published_at") if ref.get(k)]
+    return {
+        "text": overlap(_words(ref["content_text"]), _words(out["content_text"])),
+        "html": overlap(ref_words, out_words),
+        "images": 1.0 if max(ref_imgs, out_imgs) == 0 else min(ref_imgs, out_imgs) / max(ref_imgs, out_imgs),
+        "meta": sum(ref[k] == out.get(k) for k in fields) / len(fields) if fields else 1.0,
+    }
+
+def calibrate_source(key, conf, n=5, threshold=0.9, selector=None):
+    cands = candidates(conf, selector)
+    pages = []
+    for url in sample_urls(conf, n):
+        try:
+            raw, _ = fetch_html(url, timeout=60)
+        except Exception as e:
+            print(f"  fetch failed: {url} ({e})")
+            raw = None
+        if raw:
+            pages.append((url, raw))
+        time.sleep(0.3)
+    print(f"[{key}] samples={len(pages)}")
+    if not pages:
+        return None
+
+    rows = {}
+    for name, override in cands.items():
+        prof = {**DEFAULT_EXTRACT, **override}
+        secs, outs = 0.0, []
+        for url, raw in pages:
+            timings = {}
+            outs.append(extract_from_html(raw, url, prof, timings))
+            secs += sum(timings.values())
+        rows[name] = {"secs": secs / len(pages), "outs": outs}
+    refs = rows["both"]["outs"]
+    for name, row in rows.items():
+        per_page = [compare(r, o) for r, o in zip(refs, row["outs"])]
+        row["scores"] = {m: sum(p[m] for p in per_page) / len(per_page) for m in ("text", "html", "images", "meta")}
+        row["quality"] = sum(min(p.values()) for p in per_page) / len(per_page)
+
+    print(f"  {'profile':<22}{'time/page':>10}{'text':>7}{'html':>7}{'images':>8}{'meta':>7}{'quality':>9}")
+    for name, row in rows.items():
+        s = row["scores"]
+        print(f"  {name:<22}{row['secs'] * 1e3:>8.0f}ms{s['text']:>7.2f}{s['html']:>7.2f}{s['images']:>8.2f}{s['meta']:>7.2f}{row['quality']:>9.2f}")
+
+    ok = [name for name, row in rows.items() if row["quality"] >= threshold]
+    best = min(ok, key=lambda name: rows[name]["secs"])
+    suggested = {k: v for k, v in cands[best].items() if DEFAULT_EXTRACT.get(k) != v}
+    print(f"  -> suggested: {best}  \"extract\": {json.dumps(suggested, ensure_ascii=False)}")
+    return best, suggested
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m scripts.calibrate")
+    ap.add_argument("sources", nargs="*", help="SOURCES 中的键（默认全部）")
+    ap.add_argument("--sample", type=int, default=5, help="每个来源抽样的文章数")
+    ap.add_argument("--threshold", type=float, default=0.9, help="相对当前默认档案的最低质量")
+    ap.add_argument("--selector", default=None, help="额外评估的正文 CSS 选择器（单个来源时使用）")
+    args = ap.parse_args(argv)
+    unknown = [k for k in args.sources if k not in SOURCES]
+    if unknown:
+        ap.error(f"unknown source: {', '.join(unknown)}")
+
+    suggestions = {}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for key in (args.sources or list(SOURCES)):
+            res = calibrate_source(key, SOURCES[key], args.sample, args.threshold, args.selector)
+            if res:
+                suggestions[key] = res[1]
+    report_fetch_stats()
+    changed = {k: v for k, v in suggestions.items() if v}
+    print(f"[calibrate] sources={len(suggestions)} with_cheaper_profile={len(changed)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 # 科技媒体强化：RSS 每日增量，Sitemap 回填/兜底
+# 可选字段：max_html_bytes —— 单页 HTML 大小上限（默认 MAX_HTML_BYTES，见 scripts.utils）
+#           extract        —— 全文抽取档案，只需写出与 DEFAULT_EXTRACT 不同的字段（见文件末尾）
 SOURCES = {
     "wired": {
         "display_name": "WIRED",
@@ -180,3 +182,48 @@ GITHUB_REPOS = [
     {"owner": "plsy1", "repo": "emagzines", "branch": "", "roots": ["."], "exts": [".md", ".txt", ".html"], "max_files": 150},
     {"owner": "hehonghui", "repo": "awesome-english-ebooks", "branch": "", "roots": ["."], "exts": [".md", ".txt", ".html"], "max_files": 150},
 ]
+
+# 全文抽取档案（默认值；来源可用 "extract" 覆盖其中的字段）：
+#   engines      —— 运行哪些引擎：trafilatura（纯文本 + 元数据）、readability（清洁 HTML）
+#   trafilatura / readability —— 传给对应引擎的参数；来源只需写出要改的参数，按键合并到默认参数上
+#   selector     —— 正文容器的 CSS 选择器；命中时直接作为 content_html，不再跑 readability
+#   drop         —— 从正文中删除的元素（CSS 选择器列表）
+# 用 python -m scripts.calibrate 抽样比较各档案的耗时与输出相似度，得到建议档案
+DEFAULT_EXTRACT = {
+    "engines": ["trafilatura", "readability"],
+    "trafilatura": {"favor_recall": True, "include_comments": False},
+    "readability": {},
+    "selector": "",
+    "drop": [],
+}
+
+# 正文 HTML 精简（transform_content_html 之后；python -m scripts.slim 可批量处理已有月份文件）：
+#   tags       —— 保留的标签，其余标签去掉外壳、保留内容（div/span/section 等包装层）
+#   drop_tags  —— 连同内容一起删除的标签
+#   attrs      —— 各标签允许的属性（"*" 对所有标签生效），class/id/style/data-* 等一律去掉
+#   srcset_max —— srcset 最多保留几档尺寸（保留最小、最大与均匀间隔的中间档）
+# 链接的 target/rel、图片的 loading/decoding 由前端渲染时补上，不再写入数据文件
+SLIM_HTML = {
+    "enabled": True,
+    "tags": [
+        "p", "br", "hr", "a", "em", "strong", "b", "i", "u", "s", "del", "ins", "sub", "sup", "small", "mark",
+        "q", "cite", "abbr", "code", "pre", "kbd", "blockquote", "h1", "h2", "h3", "h4", "h5", "h6",
+        "ul", "ol", "li", "dl", "dt", "dd", "figure", "figcaption", "picture", "source", "img", "video", "audio",
+        "table", "caption", "thead", "tbody", "tfoot", "tr", "th", "td",
+    ],
+    "drop_tags": ["script", "style", "noscript", "iframe", "svg", "form", "button", "input", "select", "textarea", "template"],
+    "attrs": {
+        "*": [],
+        "a": ["href", "title"],
+        "img": ["src", "srcset", "sizes", "alt", "width", "height"],
+        "source": ["src", "srcset", "sizes", "media", "type"],
+        "video": ["src", "poster", "controls"],
+        "audio": ["src", "controls"],
+        "ol": ["start", "type"],
+        "th": ["colspan", "rowspan", "scope"],
+        "td": ["colspan", "rowspan"],
+        "blockquote": ["cite"],
+        "abbr": ["title"],
+    },
+    "srcset_max": 3,
+}
@@ -1,31 +1,37 @@
 # -*- coding: utf-8 -*-
 """
 全文抽取（本地解析，不绕过付费墙）：
-- trafilatura: 结构化元数据 + 纯文本
-- readability: 清洁 HTML（保留图片）
+- 按来源档案（SOURCES[...]["extract"]，缺省 DEFAULT_EXTRACT）决定运行哪些引擎：
+  - trafilatura: 结构化元数据 + 纯文本
+  - readability: 清洁 HTML（保留图片）
+  - selector: 按 CSS 选择器直接取正文容器，命中时不再跑 readability
 - transform_content_html: 绝对化图片/链接、懒加载、安全清理
+- slim_content_html: 标签/属性白名单精简（scripts.slim，配置 SLIM_HTML）
 - 提取封面图：og:image 或正文第一张图
+- 返回跳转后的最终 URL 与页面声明的规范 URL（<link rel=canonical> / og:url），供 scripts.aliases 记录别名
+- 返回 ETag / Last-Modified 与页面内容哈希，供 scripts.refresh 做条件请求复查
 """
-import json
-from readability import Document
+import json, time, hashlib
+from html import escape
+from urllib.parse import urljoin
 from bs4 import BeautifulSoup
-from dateutil import parser as dtparser
 from datetime import datetime, timezone
-from scripts.utils import http_get, transform_content_html
+from scripts.config import DEFAULT_EXTRACT
+from scripts.utils import fetch_html, transform_content_html, parse_datetime, source_conf_for
+from scripts.slim import slim_content_html
 
 def _to_iso(dt):
     if not dt: return ""
     if isinstance(dt, str):
-        try: d = dtparser.parse(dt)
+        try: d = parse_datetime(dt)
         except Exception: return ""
     else:
         d = dt
     if d.tzinfo is None: d = d.replace(tzinfo=timezone.utc)
     return d.astimezone(timezone.utc).isoformat()
 
-def _cover_from_html(raw_html: str, base_url: str) -> str:
+def _cover_from_html(soup) -> str:
     try:
-        soup = BeautifulSoup(raw_html, "html.parser")
         og = soup.find("meta", attrs={"property":"og:image"})
         if og and og.get("content"):
             return og["content"].strip()
@@ -47,44 +53,127 @@ def _cover_from_content(content_html: str, base_url: str) -> str:
         pass
     return ""
 
-def extract_fulltext(url: str, timeout: int = 60):
-    r = http_get(url, headers={
-        "Accept":"text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"
-    }, timeout=timeout)
-    ctype = r.headers.get("Content-Type","").lower()
-    if "text/html" not in ctype:
+def _title_from_html(soup) -> str:
+    og = soup.find("meta", attrs={"property":"og:title"})
+    if og and og.get("content"):
+        return og["content"].strip()
+    return soup.title.get_text().strip() if soup.title else ""
+
+def _canonical_from_html(soup, base_url: str) -> str:
+    try:
+        link = soup.find("link", rel="canonical")
+        href = link.get("href") if link else ""
+        if not href:
+            og = soup.find("meta", attrs={"property":"og:url"})
+            href = og.get("content") if og else ""
+        return urljoin(base_url, href.strip()) if href else ""
+    except Exception:
+        return ""
+
+# 按键合并（而不是整体替换）的引擎参数子字典
+ENGINE_OPTION_KEYS = ("trafilatura", "readability")
+
+def extract_profile(url: str, override=None):
+    """
+    来源的抽取档案：DEFAULT_EXTRACT 叠加 SOURCES[...]["extract"]，再叠加 override。
+    trafilatura / readability 两个引擎参数按键合并一层，只写一个参数不会丢掉默认的其余参数。
+    """
+    prof = {k: dict(v) if isinstance(v, dict) else v for k, v in DEFAULT_EXTRACT.items()}
+    for extra in (source_conf_for(url).get("extract"), override):
+        for k, v in (extra or {}).items():
+            if k in ENGINE_OPTION_KEYS and isinstance(v, dict):
+                prof[k] = {**(prof.get(k) or {}), **v}
+            else:
+                prof[k] = v
+    return prof
+
+def run_trafilatura(raw_html: str, url: str, options=None):
+    import trafilatura
+    j = trafilatura.extract(raw_html, output_format="json", url=url, **(options or {}))
+    if not j:
         return {}
+    data = json.loads(j)
+    return {
+        "title": (data.get("title") or "").strip(),
+        "author": (data.get("author") or "").strip(),
+        "published_at": _to_iso(data.get("date")),
+        "content_text": (data.get("text") or "").strip(),
+    }
 
-    raw_html = r.text
+def run_readability(raw_html: str, options=None):
+    from readability import Document
+    doc = Document(raw_html, **(options or {}))
+    return {"title": (doc.short_title() or "").strip(), "content_html": doc.summary() or ""}
+
+def run_selector(soup, selector: str) -> str:
+    node = soup.select_one(selector)
+    return str(node) if node is not None else ""
+
+def _drop_elements(content_html: str, selectors) -> str:
+    frag = BeautifulSoup(content_html, "html.parser")
+    for sel in selectors:
+        for el in frag.select(sel):
+            el.decompose()
+    return str(frag)
+
+def extract_from_html(raw_html: str, url: str, profile=None, timings=None):
+    """
+    按档案从已下载的 HTML 中抽取正文；timings 不为 None 时按阶段累加耗时（秒），
+    供 scripts.calibrate 比较不同档案。
+    """
+    prof = profile or extract_profile(url)
+    engines = prof.get("engines") or []
+    t = timings if timings is not None else {}
+    def _lap(stage, t0):
+        t[stage] = t.get(stage, 0.0) + time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    soup = BeautifulSoup(raw_html, "html.parser")
+    _lap("parse", t0)
 
     # 1) trafilatura（元数据 + 纯文本）
-    meta_title = meta_author = meta_date = ""
-    text_plain = ""
-    try:
-        import trafilatura
-        j = trafilatura.extract(raw_html, output_format="json", favor_recall=True, include_comments=False, url=url)
-        if j:
-            data = json.loads(j)
-            text_plain  = (data.get("text") or "").strip()
-            meta_title  = (data.get("title") or "").strip()
-            meta_author = (data.get("author") or "").strip()
-            meta_date   = _to_iso(data.get("date"))
-    except Exception:
-        pass
+    meta = {}
+    if "trafilatura" in engines:
+        t0 = time.perf_counter()
+        try:
+            meta = run_trafilatura(raw_html, url, prof.get("trafilatura"))
+        except Exception:
+            pass
+        _lap("trafilatura", t0)
+    meta_title = meta.get("title") or ""
+    text_plain = meta.get("content_text") or ""
 
-    # 2) readability（清洁 HTML，包含图片）
+    # 2) 正文 HTML：选择器优先，其次 readability（清洁 HTML，包含图片）
     content_html = ""
-    try:
-        doc = Document(raw_html)
-        content_html = doc.summary() or ""
-        if not meta_title:
-            meta_title = (doc.short_title() or "").strip()
-    except Exception:
-        pass
+    if prof.get("selector"):
+        t0 = time.perf_counter()
+        try:
+            content_html = run_selector(soup, prof["selector"])
+        except Exception:
+            pass
+        _lap("selector", t0)
+    if not content_html and "readability" in engines:
+        t0 = time.perf_counter()
+        try:
+            r = run_readability(raw_html, prof.get("readability"))
+            content_html = r["content_html"]
+            if not meta_title:
+                meta_title = r["title"]
+        except Exception:
+            pass
+        _lap("readability", t0)
+    elif not content_html and text_plain:
+        # 只跑 trafilatura：按段落拼出 HTML（不含图片）
+        content_html = "".join(f"<p>{escape(p.strip())}</p>" for p in text_plain.split("\n") if p.strip())
+    if not meta_title and "readability" not in engines:
+        meta_title = _title_from_html(soup)
 
-    # 3) HTML 规范化：绝对化图片/链接、懒加载、安全清理（保留媒体）
-    cover = _cover_from_html(raw_html, url)
+    # 3) HTML 规范化：删除档案指定的元素，绝对化图片/链接、懒加载、安全清理（保留媒体）
+    t0 = time.perf_counter()
+    cover = _cover_from_html(soup)
     if content_html:
+        if prof.get("drop"):
+            content_html = _drop_elements(content_html, prof["drop"])
         content_html = transform_content_html(content_html, url)
         if not cover:
             cover = _cover_from_content(content_html, url)
@@ -95,13 +184,37 @@ def extract_fulltext(url: str, timeout: int = 60):
             text_plain = BeautifulSoup(content_html, "html.parser").get_text("\n").strip()
         except Exception:
             pass
+    _lap("transform", t0)
+
+    # 4) 精简：去掉 class/style/data-* 与包装层，限制 srcset，去重图片
+    if content_html:
+        t0 = time.perf_counter()
+        content_html = slim_content_html(content_html)
+        _lap("slim", t0)
 
     return {
         "title": meta_title or "",
-        "author": meta_author or "",
-        "published_at": meta_date or "",
+        "author": meta.get("author") or "",
+        "published_at": meta.get("published_at") or "",
         "updated_at": "",
         "content_text": text_plain or "",
         "content_html": content_html or "",
         "cover_image": cover or "",
+        "canonical_url": _canonical_from_html(soup, url),
     }
+
+def body_hash(raw_html: str) -> str:
+    return hashlib.sha256(raw_html.encode("utf-8")).hexdigest()
+
+def extract_fulltext(url: str, timeout: int = 60, max_bytes: int = None, profile=None):
+    # 流式抓取：非 HTML / 超过大小上限的页面在下载正文前就放弃
+    raw_html, r = fetch_html(url, timeout=timeout, max_bytes=max_bytes)
+    if raw_html is None:
+        return {}
+    final_url = r.url or url
+    data = extract_from_html(raw_html, final_url, profile)
+    data["final_url"] = final_url
+    data["etag"] = r.headers.get("ETag") or ""
+    data["last_modified"] = r.headers.get("Last-Modified") or ""
+    data["body_sha256"] = body_hash(raw_html)
+    return data
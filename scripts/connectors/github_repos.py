@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
-import requests, re, html
+import re, html
 from datetime import datetime, timezone
 from urllib.parse import quote
+from scripts.utils import http_session
 
 HEADERS = {
     "User-Agent": "NewsPortalBot/1.4 (+https://github.com/)",
@@ -15,7 +16,7 @@ ALLOWED_LICENSES = {
 }
 
 def gh_get(url, timeout=30):
-    r = requests.get(url, headers=HEADERS, timeout=timeout)
+    r = http_session().get(url, headers=HEADERS, timeout=timeout)
     r.raise_for_status()
     return r.json()
 
@@ -34,7 +35,7 @@ def list_tree(owner, repo, branch):
 
 def fetch_raw(owner, repo, branch, path):
     url = f"https://raw.githubusercontent.com/{owner}/{repo}/{branch}/{path}"
-    r = requests.get(url, headers={"User-Agent": HEADERS["User-Agent"], "Accept":"text/plain"}, timeout=45)
+    r = http_session().get(url, headers={"User-Agent": HEADERS["User-Agent"], "Accept":"text/plain"}, timeout=45)
     r.raise_for_status()
     return r.text
 
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+feed_reader.py
+增量轮询用的轻量 RSS/Atom 读取：
+- 流式下载 + xml.etree.XMLPullParser，只取用到的字段：link/id、title、summary、author、时间；
+  按命名空间匹配（RSS、Atom、DC），media:* 等扩展元素不会覆盖核心字段；摘要存为纯文本
+- feed 通常按新到旧排列：连续 FEED_STOP_AFTER 条已在去重集合中或早于 cutoff 时，
+  断开连接不再读取剩余部分（设为 0 关闭提前终止）
+- XML 不合法或不是 RSS/Atom 时回退 feedparser（用已下载的字节，不重复请求）
+- 统计计入 READER_STATS，结束时 report_reader_stats() 打印
+"""
+import os, re, html
+from datetime import datetime, timezone
+from xml.etree.ElementTree import XMLPullParser, ParseError
+from scripts.utils import http_get, sha1, canonicalize_url, to_iso
+
+FEED_STOP_AFTER = int(os.getenv("FEED_STOP_AFTER") or 5)
+CHUNK_BYTES = 16 * 1024
+
+READER_STATS = {"feeds": 0, "fallback": 0, "early_stop": 0, "entries": 0, "bytes_read": 0}
+
+_FEED_ROOTS = {"rss", "feed", "RDF"}
+_SCRIPT_STYLE = re.compile(r"<(script|style)\b.*?</\1\s*>", re.I | re.S)
+_TAG = re.compile(r"<[^>]*>")
+_WS = re.compile(r"\s+")
+
+# 只认这些命名空间下的元素；media:title、media:content 等扩展元素不参与字段映射
+_RSS_NS = ("", "http://purl.org/rss/1.0/")          # RSS 0.9x/2.0 无命名空间；RSS 1.0 (RDF)
+_ATOM_NS = ("http://www.w3.org/2005/Atom", "http://purl.org/atom/ns#")
+_DC_NS = "http://purl.org/dc/elements/1.1/"
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+def _split_tag(tag):
+    """"{ns}name" -> (ns, name)；无命名空间时 ns 为空串。"""
+    if not isinstance(tag, str):
+        return None, ""
+    if tag.startswith("{"):
+        ns, _, name = tag[1:].partition("}")
+        return ns, name
+    return "", tag
+
+def _text(el):
+    return (el.text or "").strip() if el is not None else ""
+
+def _inner(el):
+    """元素的全部文本（含子元素，用于 Atom type="xhtml" 的内容）。"""
+    return "".join(el.itertext()).strip()
+
+def _set(out, key, value, replace=False):
+    """只写入非空值；replace=False 时已有非空值优先。"""
+    if value and (replace or not out.get(key)):
+        out[key] = value
+
+def _entry_from_element(el):
+    """RSS <item> / Atom <entry> -> 与 feedparser entry 同名的字段（日期为原始字符串）。"""
+    out = {}
+    atom_content = ""
+    for child in el:
+        ns, name = _split_tag(child.tag)
+        if ns in _ATOM_NS:
+            if name == "link":
+                if child.get("rel", "alternate") == "alternate":
+                    _set(out, "link", (child.get("href") or "").strip())
+            elif name == "id":
+                _set(out, "id", _text(child))
+            elif name == "title":
+                _set(out, "title", html.unescape(_inner(child) if child.get("type") == "xhtml" else _text(child)))
+            elif name == "summary":
+                _set(out, "summary", _inner(child) if child.get("type") == "xhtml" else _text(child))
+            elif name == "content":
+                atom_content = atom_content or (_inner(child) if child.get("type") == "xhtml" else _text(child))
+            elif name == "author":
+                nm = next((c for c in child if _split_tag(c.tag) == (ns, "name")), None)
+                _set(out, "author", _text(nm))
+            elif name in ("published", "issued"):
+                _set(out, "published", _text(child))
+            elif name in ("updated", "modified"):
+                _set(out, "updated", _text(child))
+        elif ns in _RSS_NS:
+            if name == "link":
+                _set(out, "link", _text(child))
+            elif name == "guid":
+                _set(out, "id", _text(child))
+            elif name == "title":
+                _set(out, "title", html.unescape(_text(child)))
+            elif name == "description":
+                _set(out, "summary", _text(child))
+            elif name == "author":
+                _set(out, "author", _text(child))
+            elif name == "pubDate":
+                _set(out, "published", _text(child))
+        elif ns == _DC_NS:
+            if name == "creator":
+                _set(out, "author", _text(child))
+            elif name == "date":
+                _set(out, "updated", _text(child))
+    # Atom 没有 <summary> 时用 <content> 代替（与 feedparser 一致）
+    _set(out, "summary", atom_content)
+    return out
+
+def plain_summary(value):
+    """摘要只存纯文本：去掉 script/style 与全部标签（含 on* 等属性），反转义并合并空白。"""
+    if not value:
+        return ""
+    text = _TAG.sub(" ", _SCRIPT_STYLE.sub(" ", value))
+    return _WS.sub(" ", html.unescape(text)).strip()
+
+def entry_time(e):
+    """entry（快速路径的 dict 或 feedparser entry）的发布时间，ISO；都没有时取当前时间。"""
+    for k in ("published", "updated", "created"):
+        if e.get(k):
+            try: return to_iso(e[k])
+            except Exception: pass
+    for k in ("published_parsed", "updated_parsed"):
+        dt = e.get(k)
+        if dt:
+            try: return to_iso(datetime(*dt[:6], tzinfo=timezone.utc))
+            except Exception: pass
+    return to_iso(datetime.now(timezone.utc))
+
+def _normalize(e):
+    return {
+        "link": e.get("link") or e.get("id") or "",
+        "title": (e.get("title") or "").strip(),
+        "summary": plain_summary(e.get("summary") or e.get("description") or ""),
+        "author": (e.get("author") or "").strip(),
+        "published_at": entry_time(e),
+    }
+
+def _fallback(data: bytes):
+    import feedparser
+    READER_STATS["fallback"] += 1
+    return [_normalize(e) for e in getattr(feedparser.parse(data), "entries", [])]
+
+def read_feed(url, known=None, cutoff_iso="", stop_after=None, timeout=25):
+    """
+    返回条目列表：{link, title, summary, author, published_at}（published_at 为 ISO）。
+    known 为已入库 id 集合；连续 stop_after 条已知或早于 cutoff_iso 时提前结束。
+    """
+    stop_after = FEED_STOP_AFTER if stop_after is None else stop_after
+    READER_STATS["feeds"] += 1
+    r = http_get(url, headers={"Accept": "application/rss+xml, application/atom+xml, application/xml;q=0.9, */*;q=0.8"},
+                 timeout=timeout, stream=True)
+    buf = bytearray()
+    entries, run, stopped = [], 0, False
+    chunks = r.iter_content(chunk_size=CHUNK_BYTES)
+    try:
+        parser = XMLPullParser(events=("start", "end"))
+        root_ok = None
+        for chunk in chunks:
+            buf += chunk
+            parser.feed(chunk)
+            for event, el in parser.read_events():
+                if event == "start":
+                    if root_ok is None:
+                        root_ok = _local(el.tag) in _FEED_ROOTS
+                        if not root_ok:
+                            raise ParseError(f"not a feed: <{_local(el.tag)}>")
+                    continue
+                ns, name = _split_tag(el.tag)
+                if not ((name == "item" and ns in _RSS_NS) or (name == "entry" and ns in _ATOM_NS)):
+                    continue
+                e = _normalize(_entry_from_element(el))
+                el.clear()
+                if not e["link"]:
+                    continue
+                entries.append(e)
+                old = bool(cutoff_iso) and e["published_at"] < cutoff_iso
+                seen = known is not None and sha1(canonicalize_url(e["link"])) in known
+                run = run + 1 if (old or seen) else 0
+                if stop_after and run >= stop_after:
+                    stopped = True
+                    break
+            if stopped:
+                break
+        if not stopped:
+            parser.close()
+            if root_ok is None:
+                raise ParseError("empty document")
+    except ParseError:
+        # 读完剩余部分交给 feedparser（其容错能处理大多数不规范的 feed）
+        for chunk in chunks:
+            buf += chunk
+        entries = _fallback(bytes(buf))
+    finally:
+        r.close()
+    READER_STATS["bytes_read"] += len(buf)
+    READER_STATS["entries"] += len(entries)
+    READER_STATS["early_stop"] += int(stopped)
+    return entries
+
+def reset_reader_stats():
+    for k in READER_STATS:
+        READER_STATS[k] = 0
+
+def report_reader_stats(prefix="[feeds]"):
+    st = READER_STATS
+    print(f"{prefix} feeds={st['feeds']} entries={st['entries']} early_stop={st['early_stop']} "
+          f"fallback={st['fallback']} read={st['bytes_read'] / 1e6:.1f}MB")
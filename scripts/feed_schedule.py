@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+feed_schedule.py
+按观测到的发布节奏自适应轮询 RSS：
+- 每个 feed 记录：轮询次数、最近轮询/最近有新条目的时间、新条目速率（EWMA，条/小时）、
+  按小时（UTC）统计的发布时刻分布、最近若干次轮询的新增数
+- 下次到期时间：从本次轮询起，按“速率 × 发布时刻分布”累积预期新增，
+  达到 FEED_TARGET_ITEMS 的时刻即到期（限制在 [MIN, MAX] 小时之间）
+- 未到期的 feed 跳过；FORCE_ALL_FEEDS=1 或 --force-all 强制全部轮询
+- 状态保存在 docs/data/feed_schedule.json
+"""
+import os
+from datetime import timezone, timedelta
+from scripts.utils import DATA_ROOT, load_json, save_json, to_iso, parse_datetime
+
+SCHEDULE_NAME = "feed_schedule.json"
+FEED_TARGET_ITEMS = float(os.getenv("FEED_TARGET_ITEMS") or 1.0)
+FEED_MIN_INTERVAL_HOURS = float(os.getenv("FEED_MIN_INTERVAL_HOURS") or 0.5)
+FEED_MAX_INTERVAL_HOURS = float(os.getenv("FEED_MAX_INTERVAL_HOURS") or 72)
+DUE_SLACK = timedelta(minutes=10)  # 定时任务启动时间有抖动，提前一点也算到期
+EWMA_ALPHA = 0.3
+HISTORY_LEN = 20
+
+def schedule_path(root=None):
+    return os.path.join(root or DATA_ROOT, SCHEDULE_NAME)
+
+def load_schedule(root=None):
+    return load_json(schedule_path(root), {})
+
+def save_schedule(state, root=None):
+    save_json(schedule_path(root), {k: state[k] for k in sorted(state)})
+
+def force_all_from_env():
+    return (os.getenv("FORCE_ALL_FEEDS") or "").strip().lower() in ("1", "true", "yes")
+
+def _parse(iso):
+    try:
+        return parse_datetime(iso) if iso else None
+    except Exception:
+        return None
+
+def is_due(state, url, now, force=False):
+    rec = state.get(url)
+    if force or not rec:
+        return True
+    due = _parse(rec.get("next_due"))
+    return due is None or now + DUE_SLACK >= due
+
+def _hour_weights(rec):
+    hours = rec.get("hours") or [0] * 24
+    total = sum(hours)
+    if total < 5:
+        return [1.0 / 24] * 24
+    # 加一点平滑，避免从未出现过的小时权重为 0
+    return [(h + 0.5) / (total + 12.0) for h in hours]
+
+def expected_between(rec, start, end):
+    """[start, end) 内的预期新增条数。"""
+    rate = float(rec.get("rate") or 0.0)
+    if rate <= 0 or end <= start:
+        return 0.0
+    w = _hour_weights(rec)
+    exp, t = 0.0, start
+    while t < end:
+        step_end = min(end, t.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1))
+        exp += rate * 24 * w[t.hour] * (step_end - t).total_seconds() / 3600.0
+        t = step_end
+    return exp
+
+def next_due(rec, now):
+    lo, hi = FEED_MIN_INTERVAL_HOURS, FEED_MAX_INTERVAL_HOURS
+    acc, t = 0.0, now
+    step = timedelta(minutes=30)
+    while (t - now).total_seconds() / 3600.0 < hi:
+        acc += expected_between(rec, t, t + step)
+        t += step
+        if acc >= FEED_TARGET_ITEMS:
+            break
+    hours = min(max((t - now).total_seconds() / 3600.0, lo), hi)
+    return now + timedelta(hours=hours)
+
+def expected_yield(state, url, now):
+    rec = state.get(url)
+    last = _parse(rec.get("last_poll")) if rec else None
+    if not rec or last is None:
+        return None
+    return expected_between(rec, last, now)
+
+def record_poll(state, url, now, published=()):
+    """记录一次轮询；published 为本次新入库条目的发布时间（ISO）列表。"""
+    rec = state.setdefault(url, {"polls": 0, "rate": 0.0, "hours": [0] * 24, "history": []})
+    new = len(published)
+    last = _parse(rec.get("last_poll"))
+    if last is not None:
+        gap_h = max((now - last).total_seconds() / 3600.0, FEED_MIN_INTERVAL_HOURS)
+        obs = new / gap_h
+        rec["rate"] = round(EWMA_ALPHA * obs + (1 - EWMA_ALPHA) * float(rec.get("rate") or 0.0), 4)
+    elif new:
+        # 首次轮询拿到的是 feed 里积压的条目，按一天摊开作为初值
+        rec["rate"] = round(new / 24.0, 4)
+    for iso in published:
+        dt = _parse(iso)
+        if dt is not None:
+            if dt.tzinfo is None: dt = dt.replace(tzinfo=timezone.utc)
+            rec["hours"][dt.astimezone(timezone.utc).hour] += 1
+    rec["polls"] = int(rec.get("polls") or 0) + 1
+    rec["last_poll"] = to_iso(now)
+    if new:
+        rec["last_new"] = to_iso(now)
+    rec["history"] = (rec.get("history") or [])[-(HISTORY_LEN - 1):] + [[to_iso(now), new]]
+    rec["next_due"] = to_iso(next_due(rec, now))
+    return rec
@@ -1,29 +1,27 @@
 # -*- coding: utf-8 -*-
-import sys, time
+import os, sys, time, argparse
 from datetime import datetime, timezone, timedelta
-import feedparser
-from dateutil import parser as dtparser
-from scripts.config import SOURCES, START_DATE_ISO, SITEMAP_LOOKBACK_HOURS, GITHUB_REPOS
-from scripts.utils import (HEADERS, load_dedup, save_dedup, add_item_if_new, make_item, to_iso, update_index_indexfile, extract_meta, collect_from_sitemap_index)
+from scripts.config import START_DATE_ISO, SITEMAP_LOOKBACK_HOURS
+from scripts.utils import (FETCH_STATS, report_fetch_stats, add_item_if_new, make_item, to_iso, sha1, canonicalize_url, extract_meta, collect_from_sitemap_index)
 from scripts.connectors.fulltext import extract_fulltext
 from scripts.connectors.github_repos import collect_repo_items
+from scripts import journal
+from scripts.store import get_store
+from scripts.neardup import load_fingerprints, save_fingerprints
+from scripts.aliases import KnownIds, load_aliases, save_aliases, adopt_canonical, commit_aliases
+from scripts.refresh import load_validators, save_validators, record_validators
+from scripts import feed_schedule, work_queue
+from scripts.feed_reader import READER_STATS, read_feed, report_reader_stats
+from scripts.shard import parse_shard, select_sources, select_github_repos, github_key, partial_root, reset_partial, write_partial
 
-def entry_time(e):
-    for k in ("published","updated","created"):
-        if k in e:
-            try: return to_iso(e[k])
-            except Exception: pass
-    for k in ("published_parsed","updated_parsed"):
-        if getattr(e,k,None):
-            dt = getattr(e,k)
-            try: return to_iso(datetime(*dt[:6], tzinfo=timezone.utc))
-            except Exception: pass
-    return to_iso(datetime.now(timezone.utc))
-
-def try_fill_fulltext(item):
+def try_fill_fulltext(item, aliases=None, validators=None):
+    """抓全文补全 item；返回 (item, 待记录的别名 id)，别名在条目入库后再写入别名表。"""
+    pending = []
     try:
         data = extract_fulltext(item["url"])
-        if not data: return item
+        if not data: return item, pending
+        if aliases is not None: pending = adopt_canonical(item, data, aliases)
+        if validators is not None: record_validators(validators, item["id"], data)
         if data.get("title"): item["title"] = item["title"] or data["title"]
         if data.get("author"): item["author"] = item["author"] or data["author"]
         if data.get("published_at"): item["published_at"] = data["published_at"]
@@ -34,80 +32,242 @@ def try_fill_fulltext(item):
             item["can_publish_fulltext"] = True
     except Exception as e:
         print(f"Fulltext extract failed: {e}")
-    return item
+    return item, pending
 
-def import_github_repos(dedup):
+COMMIT_EVERY = int(os.getenv("COMMIT_EVERY_DAILY") or 120)
+
+# partial 目录 -> worker 启动时附属状态的快照（snapshot_state）
+_partial_bases = {}
+
+def snapshot_state(root, fp_index, aliases, validators):
+    """分片 worker 启动时记下从主目录载入的指纹、别名与 validators，之后 save_state 只写相对它的增量。"""
+    _partial_bases[root] = {"fp": dict(fp_index["fp"]), "aliases": dict(aliases), "validators": dict(validators)}
+
+def _changed(current, base):
+    return {k: v for k, v in current.items() if k not in base or base[k] != v}
+
+def save_state(root=None, fp_index=None, aliases=None, validators=None):
+    """
+    随条目产生的附属状态；checkpoint 与收尾 compact 时与条目一同落盘，中途被 kill 也不会与日志脱节。
+    partial 目录只写 worker 新增或改动的条目：合并时不会把主目录在此期间删掉的条目带回来。
+    """
+    base = _partial_bases.get(root) if root else None
+    if fp_index is not None:
+        save_fingerprints(fp_index if base is None else {"fp": _changed(fp_index["fp"], base["fp"])}, root)
+    if aliases is not None:
+        save_aliases(aliases if base is None else _changed(aliases, base["aliases"]), root)
+    if validators is not None:
+        save_validators(validators if base is None else _changed(validators, base["validators"]), root)
+
+def import_github_repo(dedup, cfg, root=None, fp_index=None):
     added = 0
-    for cfg in GITHUB_REPOS:
-        owner, repo = cfg["owner"], cfg["repo"]
-        print(f"[GitHub] Import {owner}/{repo} ...")
-        try:
-            items = collect_repo_items(owner=owner, repo=repo, branch=cfg.get("branch",""), roots=cfg.get("roots") or ["."], exts=cfg.get("exts") or [".md",".txt",".html"], max_files=int(cfg.get("max_files", 100)))
-            for it in items:
-                base = make_item(it["url"], it["title"], it.get("source_label") or f"GitHub: {owner}/{repo}", it["published_at"], summary="")
-                base["author"] = it.get("author","")
-                base["content_text"] = it.get("content_text","")
-                base["content_html"] = it.get("content_html","")
-                base["can_publish_fulltext"] = bool(it.get("can_publish_fulltext"))
-                if add_item_if_new(dedup, base): added += 1
-        except Exception as e:
-            print(f"GitHub import failed for {owner}/{repo}: {e}")
+    owner, repo = cfg["owner"], cfg["repo"]
+    print(f"[GitHub] Import {owner}/{repo} ...")
+    try:
+        items = collect_repo_items(owner=owner, repo=repo, branch=cfg.get("branch",""), roots=cfg.get("roots") or ["."], exts=cfg.get("exts") or [".md",".txt",".html"], max_files=int(cfg.get("max_files", 100)))
+        for it in items:
+            base = make_item(it["url"], it["title"], it.get("source_label") or f"GitHub: {owner}/{repo}", it["published_at"], summary="")
+            base["author"] = it.get("author","")
+            base["content_text"] = it.get("content_text","")
+            base["content_html"] = it.get("content_html","")
+            base["can_publish_fulltext"] = bool(it.get("can_publish_fulltext"))
+            if add_item_if_new(dedup, base, root, fp_index):
+                added += 1
+                journal.checkpoint(root, COMMIT_EVERY, None if root else dedup, lambda: save_state(root, fp_index))
+    except Exception as e:
+        print(f"GitHub import failed for {owner}/{repo}: {e}")
     return added
 
-def main():
+def poll_feed(rss, conf, dedup, start_iso, root=None, fp_index=None, deadline=None, aliases=None, validators=None):
+    """抓取一个 RSS；返回 (新入库条目的发布时间列表, 是否完整跑完)。超时中断时返回 False。"""
+    print(f"[{conf['display_name']}] RSS: {rss}")
+    feed_new = []
+    known = dedup if aliases is None else KnownIds(dedup, aliases)
+    try:
+        entries = read_feed(rss, known=known, cutoff_iso=start_iso)
+    except Exception as e:
+        print(f"Feed fetch failed: {rss} ({e})")
+        entries = []
+    for e in entries:
+        if deadline is not None and deadline.expired():
+            return feed_new, False
+        url = e["link"]
+        published_iso = e["published_at"]
+        if published_iso < start_iso: continue
+        # 已入库（含经别名表解析）的条目不再抓取元数据与全文
+        if sha1(canonicalize_url(url)) in known: continue
+        title, summary, author = e["title"], e["summary"], e["author"]
+        updated_at = ""
+        if not author or not title:
+            meta = extract_meta(url)
+            if meta.get("author") and not author: author = meta["author"]
+            if meta.get("title") and not title: title = meta["title"]
+            if meta.get("published_at"): published_iso = meta["published_at"]
+            if meta.get("updated_at"): updated_at = meta["updated_at"]
+            time.sleep(0.2)
+        item = make_item(url, title or conf["display_name"], conf["display_name"], published_iso, summary, author, updated_at)
+        item, pending = try_fill_fulltext(item, aliases, validators)
+        if add_item_if_new(dedup, item, root, fp_index):
+            if aliases is not None: commit_aliases(aliases, pending, item["id"])
+            feed_new.append(item["published_at"])
+            journal.checkpoint(root, COMMIT_EVERY, None if root else dedup, lambda: save_state(root, fp_index, aliases, validators))
+    time.sleep(0.3)
+    return feed_new, True
+
+def sitemap_fallback(conf, dedup, start_iso, now, root=None, fp_index=None, deadline=None, aliases=None, validators=None):
+    """Sitemap 兜底回查最近 SITEMAP_LOOKBACK_HOURS 小时；返回 (新增条数, 是否完整跑完)。"""
+    start_fallback_iso = to_iso(now - timedelta(hours=SITEMAP_LOOKBACK_HOURS))
+    end_iso = to_iso(now)
+    print(f"[{conf['display_name']}] Sitemap 兜底 {start_fallback_iso} ~ {end_iso}")
+    added = 0
+    known = dedup if aliases is None else KnownIds(dedup, aliases)
+    rows = collect_from_sitemap_index(conf["sitemap"], start_fallback_iso, end_iso, polite_delay=0.5)
+    for (url, lastmod_iso) in rows:
+        if deadline is not None and deadline.expired():
+            return added, False
+        if lastmod_iso < start_iso: continue
+        if sha1(canonicalize_url(url)) in known: continue
+        meta = extract_meta(url)
+        title = meta.get("title","") or conf["display_name"]
+        author = meta.get("author","")
+        published = meta.get("published_at") or lastmod_iso
+        updated = meta.get("updated_at","")
+        item = make_item(url, title, conf["display_name"], published, None, author, updated)
+        item, pending = try_fill_fulltext(item, aliases, validators)
+        if add_item_if_new(dedup, item, root, fp_index):
+            if aliases is not None: commit_aliases(aliases, pending, item["id"])
+            added += 1
+            journal.checkpoint(root, COMMIT_EVERY, None if root else dedup, lambda: save_state(root, fp_index, aliases, validators))
+        time.sleep(0.15)
+    return added, True
+
+def report_schedule(polled, skipped):
+    exp_total = sum(e for (_, e, _) in polled if e is not None)
+    got_total = sum(n for (_, _, n) in polled)
+    print(f"[schedule] polled={len(polled)} skipped(not due)={skipped} expected={exp_total:.1f} actual={got_total}")
+    for (rss, e, n) in polled:
+        print(f"  {'-' if e is None else f'{e:.1f}':>6} -> {n:<3} {rss}")
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m scripts.fetch_daily")
+    ap.add_argument("--shard", help="i/n：只处理第 i 个分片（从 0 开始），结果写入 partial 目录")
+    ap.add_argument("--out", help="partial 输出目录（默认 partials/shard-i-of-n）")
+    ap.add_argument("--force-all", action="store_true", help="忽略轮询计划，所有 RSS 都抓取（亦可设 FORCE_ALL_FEEDS=1）")
+    return ap.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    shard = parse_shard(args.shard)
+    out_root = None
+    if shard:
+        out_root = partial_root(shard, args.out)
+        reset_partial(out_root)
+        print(f"[shard {shard[0]}/{shard[1]}] output -> {out_root}")
+    sources = select_sources(shard)
+
     start_iso = START_DATE_ISO + "T00:00:00Z"
     now = datetime.now(timezone.utc)
-    dedup = load_dedup()
-    total_added = 0
+    t0 = time.time()
+    if shard:
+        # worker 不写主目录：只把主目录残留日志中的 id 视为已知
+        dedup = get_store().known_ids()
+        journal.replay(dedup)
+    else:
+        recovered = journal.compact()
+        if recovered: print(f"[journal] recovered {recovered} items from previous run")
+        dedup = get_store().known_ids()
+    known = set(dedup)
+    fp_index = load_fingerprints()
+    aliases = load_aliases()
+    validators = load_validators()
+    if shard: snapshot_state(out_root, fp_index, aliases, validators)
+    schedule = feed_schedule.load_schedule()
+    force_all = args.force_all or feed_schedule.force_all_from_env()
+    stats = work_queue.load_stats()
+    deadline = work_queue.deadline_from_env(stats, t0=t0)
+    polled, skipped = [], 0
+    per_source = {key: 0 for key in sources}
 
-    for key, conf in SOURCES.items():
-        src_added = 0
+    # 工作单元：到期的 RSS、GitHub 仓库，以及上次推迟的单元；Sitemap 兜底在本来源 RSS 全部跑完后追加
+    units, rss_left = {}, {key: 0 for key in sources}
+    carried = set(stats["deferred"])
+    for key, conf in sources.items():
         for rss in conf.get("rss", []):
-            print(f"[{conf['display_name']}] RSS: {rss}")
-            feed = feedparser.parse(rss, request_headers=HEADERS)
-            for e in getattr(feed, "entries", []):
-                url = e.get("link") or e.get("id")
-                if not url: continue
-                published_iso = entry_time(e)
-                if published_iso < start_iso: continue
-                title = (e.get("title") or "").strip()
-                summary = (e.get("summary") or e.get("description") or "").strip()
-                author = (e.get("author") or "").strip()
-                updated_at = ""
-                if not author or not title:
-                    meta = extract_meta(url)
-                    if meta.get("author") and not author: author = meta["author"]
-                    if meta.get("title") and not title: title = meta["title"]
-                    if meta.get("published_at"): published_iso = meta["published_at"]
-                    if meta.get("updated_at"): updated_at = meta["updated_at"]
-                    time.sleep(0.2)
-                item = make_item(url, title or conf["display_name"], conf["display_name"], published_iso, summary, author, updated_at)
-                item = try_fill_fulltext(item)
-                if add_item_if_new(dedup, item):
-                    src_added += 1; total_added += 1
-            time.sleep(0.3)
-        if src_added == 0 and conf.get("sitemap"):
-            start_fallback_iso = to_iso(now - timedelta(hours=SITEMAP_LOOKBACK_HOURS))
-            end_iso = to_iso(now)
-            print(f"[{conf['display_name']}] Sitemap 兜底 {start_fallback_iso} ~ {end_iso}")
-            rows = collect_from_sitemap_index(conf["sitemap"], start_fallback_iso, end_iso, polite_delay=0.5)
-            for (url, lastmod_iso) in rows:
-                if lastmod_iso < start_iso: continue
-                meta = extract_meta(url)
-                title = meta.get("title","") or conf["display_name"]
-                author = meta.get("author","")
-                published = meta.get("published_at") or lastmod_iso
-                updated = meta.get("updated_at","")
-                item = make_item(url, title, conf["display_name"], published, None, author, updated)
-                item = try_fill_fulltext(item)
-                if add_item_if_new(dedup, item):
-                    src_added += 1; total_added += 1
-                time.sleep(0.15)
-
-    gh_added = import_github_repos(dedup)
+            uid = "rss:" + rss
+            if uid in carried or feed_schedule.is_due(schedule, rss, now, force_all):
+                units[uid] = ("rss", key, rss)
+                rss_left[key] += 1
+            else:
+                skipped += 1
+        if conf.get("sitemap") and "sitemap:" + key in carried:
+            units["sitemap:" + key] = ("sitemap", key, None)
+    for cfg in select_github_repos(shard):
+        units[github_key(cfg)] = ("github", None, cfg)
+
+    def run_unit(uid):
+        kind, key, arg = units[uid]
+        if kind == "rss":
+            expected = feed_schedule.expected_yield(schedule, arg, now)
+            feed_new, complete = poll_feed(arg, sources[key], dedup, start_iso, out_root, fp_index, deadline, aliases, validators)
+            per_source[key] += len(feed_new)
+            if complete:
+                feed_schedule.record_poll(schedule, arg, now, feed_new)
+                polled.append((arg, expected, len(feed_new)))
+            return len(feed_new), complete
+        if kind == "sitemap":
+            n, complete = sitemap_fallback(sources[key], dedup, start_iso, now, out_root, fp_index, deadline, aliases, validators)
+            per_source[key] += n
+            return n, complete
+        return import_github_repo(dedup, arg, out_root, fp_index), True
+
+    def follow_up(uid):
+        kind, key, _ = units[uid]
+        if kind != "rss":
+            return []
+        rss_left[key] -= 1
+        # 本来源的 RSS 都跑完且无新增时才走 Sitemap 兜底（未到期的 RSS 不触发）
+        sm = "sitemap:" + key
+        if rss_left[key] == 0 and per_source[key] == 0 and sources[key].get("sitemap") and sm not in units:
+            units[sm] = ("sitemap", key, None)
+            return [sm]
+        return []
+
+    done, deferred = work_queue.drain(list(units), run_unit, deadline, stats, now, follow_up)
+    total_added = sum(per_source.values())
+    gh_added = sum(n for (uid, n, _) in done if units[uid][0] == "github")
     print(f"[GitHub] imported: {gh_added}")
-    save_dedup(dedup)
-    update_index_indexfile()
+
+    # 收尾（预算中始终为这一步留出余量）
+    t_flush = time.time()
+    journal.compact(out_root, None if shard else dedup, lambda: save_state(out_root, fp_index, aliases, validators))
+    report_schedule(polled, skipped)
+    work_queue.report(done, deferred, deadline, stats)
+    report_reader_stats()
+    report_fetch_stats()
+    if shard:
+        mine = {rss for conf in sources.values() for rss in conf.get("rss", [])}
+        feed_schedule.save_schedule({u: r for u, r in schedule.items() if u in mine}, out_root)
+        write_partial(out_root, dedup - known, {
+            "kind": "daily",
+            "shard": f"{shard[0]}/{shard[1]}",
+            "sources": sorted(sources),
+            "added": per_source,
+            "github_added": gh_added,
+            "total_added": total_added + gh_added,
+            "feeds_polled": len(polled),
+            "feeds_skipped": skipped,
+            "deferred": deferred,
+            "fetch": dict(FETCH_STATS),
+            "feeds": dict(READER_STATS),
+            "started_at": to_iso(now),
+            "elapsed_sec": round(time.time() - t0, 1),
+        })
+        stats["flush_secs"] = round(time.time() - t_flush, 2)
+        work_queue.save_stats(work_queue.shard_stats(stats, units), out_root)
+    else:
+        feed_schedule.save_schedule(schedule)
+        stats["flush_secs"] = round(time.time() - t_flush, 2)
+        work_queue.save_stats(stats)
     print(f"Done. New items added: {total_added + gh_added}")
     return 0
 
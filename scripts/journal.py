@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+journal.py
+追加式入库日志（JSONL）：
+- append_item：每条新条目追加一行并 fsync，O(1) 写入，被中途 kill 也不会丢已接受的条目
+- compact：把日志批量折叠进月份文件、dedup.json 与 index.json，然后清空日志
+- 启动时先 compact 一次，相当于重放上次中断留下的日志，实现精确续跑
+
+折叠按 id 合并（同 id 以日志中最后一条为准），重复执行结果不变；
+日志尾部被截断的半行会被跳过。
+"""
+import os
+from scripts.utils import DATA_ROOT, dumps_json, loads_json
+
+JOURNAL_NAME = "journal.jsonl"
+
+_handles = {}
+_pending = {}
+
+def journal_path(root=None):
+    return os.path.join(root or DATA_ROOT, JOURNAL_NAME)
+
+def _handle(path):
+    f = _handles.get(path)
+    if f is None or f.closed:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        f = open(path, "a+b")
+        # 上次写入若被截断，先补一个换行，避免新行与半行粘连
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+        _handles[path] = f
+    return f
+
+def close(root=None):
+    f = _handles.pop(journal_path(root), None)
+    if f is not None and not f.closed:
+        f.close()
+
+def append_item(item, root=None):
+    f = _handle(journal_path(root))
+    f.write(dumps_json(item, compact=True) + b"\n")
+    f.flush()
+    os.fsync(f.fileno())
+    _pending[f.name] = _pending.get(f.name, 0) + 1
+
+def read_journal(root=None):
+    path = journal_path(root)
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                it = loads_json(line)
+            except Exception:
+                continue
+            if isinstance(it, dict) and it.get("id") and it.get("published_at"):
+                yield it
+
+def replay(dedup, root=None):
+    """把日志中的 id 并入内存中的 dedup 集合，返回条目数。"""
+    n = 0
+    for it in read_journal(root):
+        dedup.add(it["id"])
+        n += 1
+    return n
+
+def compact(root=None, dedup=None, on_compact=None):
+    """
+    折叠日志：通过存储后端（scripts.store）一次性批量写入，每个受影响的月份只读写一次，
+    随后写 dedup（及主目录的 index），最后删除日志。
+    在任一步被中断时日志仍在，下次 compact 会重新折叠，结果一致。
+    on_compact 在删除日志之前调用，用来让随条目产生的附属状态（近重复指纹等）与条目一同落盘。
+    返回被折叠的条目数。
+    """
+    from scripts.store import get_store
+    items = {}
+    for it in read_journal(root):
+        items[it["id"]] = it
+    if not items and dedup is None:
+        if on_compact is not None:
+            on_compact()
+        close(root)
+        return 0
+
+    store = get_store(root)
+    store.put(list(items.values()))
+    if dedup:
+        store.add_known(dedup)
+    store.flush()
+    if on_compact is not None:
+        on_compact()
+
+    close(root)
+    path = journal_path(root)
+    if os.path.exists(path):
+        os.remove(path)
+    _pending.pop(path, None)
+    return len(items)
+
+def checkpoint(root=None, every=0, dedup=None, on_compact=None):
+    """日志中累计 every 条未折叠的新条目时 compact 一次（every<=0 关闭）。"""
+    if every > 0 and _pending.get(journal_path(root), 0) >= every:
+        n = compact(root, dedup, on_compact)
+        print(f"[journal] checkpoint: compacted {n} items")
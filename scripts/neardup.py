@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+neardup.py
+近重复检测（SimHash + 分段 LSH）：
+- 入库时对 content_text 计算 64 位 SimHash（3 词 shingle）
+- 64 位切成 MAX_DISTANCE+1 段，任一段相同即为候选（抽屉原理保证不漏掉
+  汉明距离 <= MAX_DISTANCE 的指纹），查询只比较同桶候选，无需全表扫描
+- 指纹持久化在 docs/data/fingerprints.json（id -> 16 位十六进制）
+- 策略 NEARDUP_POLICY：link（默认，保留元数据并写 duplicate_of，清空正文）、
+  drop（不入库，仅记入 dedup 防止重复抓取）、off（关闭）
+- 批量模式：python -m scripts.neardup scan [--apply] [--rebuild]，全量查找已有重复；
+  默认只列出，--apply 写回月份文件并重建指纹，--rebuild 只重建指纹
+"""
+import os, re, sys, hashlib, argparse
+from scripts.utils import DATA_ROOT, load_json, save_json
+from scripts.store import get_store
+
+FINGERPRINTS_NAME = "fingerprints.json"
+NEARDUP_POLICY = (os.getenv("NEARDUP_POLICY") or "link").strip().lower()
+MAX_DISTANCE = int(os.getenv("NEARDUP_MAX_DISTANCE") or 3)
+MIN_TOKENS = 40      # 正文过短时指纹不可靠，不参与判重
+SHINGLE = 3
+BITS = 64
+
+_word = re.compile(r"\w+", re.UNICODE)
+
+# 第 j 位为 1 的字节映射为 1，其余为 0：按列统计位计数时用 bytes.translate 代替逐位循环
+_BIT_TABLES = [bytes((x >> j) & 1 for x in range(256)) for j in range(8)]
+
+def simhash(text: str):
+    tokens = _word.findall((text or "").lower())
+    if len(tokens) < MIN_TOKENS:
+        return None
+    data = b"".join(
+        hashlib.blake2b(" ".join(tokens[i:i + SHINGLE]).encode("utf-8"), digest_size=8).digest()
+        for i in range(len(tokens) - SHINGLE + 1)
+    )
+    total = len(data) // 8
+    sig = 0
+    for k in range(8):
+        col = data[k::8]
+        for j in range(8):
+            if 2 * col.translate(_BIT_TABLES[j]).count(1) > total:
+                sig |= 1 << ((7 - k) * 8 + j)
+    return sig
+
+def distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+def _bands(sig: int, max_distance: int):
+    n = max_distance + 1
+    width = BITS // n
+    for i in range(n):
+        lo = i * width
+        hi = BITS if i == n - 1 else lo + width
+        yield (i, (sig >> lo) & ((1 << (hi - lo)) - 1))
+
+def new_index(max_distance=None):
+    return {"max_distance": MAX_DISTANCE if max_distance is None else max_distance, "fp": {}, "buckets": {}}
+
+def index_add(index, item_id, sig):
+    index["fp"][item_id] = sig
+    for band in _bands(sig, index["max_distance"]):
+        index["buckets"].setdefault(band, []).append(item_id)
+
+def index_query(index, sig, exclude=None):
+    """返回 (最近的 id, 距离)，没有 <= max_distance 的候选时返回 (None, None)。"""
+    best, best_d = None, None
+    seen = set()
+    for band in _bands(sig, index["max_distance"]):
+        for cid in index["buckets"].get(band, ()):
+            if cid in seen or cid == exclude:
+                continue
+            seen.add(cid)
+            d = distance(sig, index["fp"][cid])
+            if d <= index["max_distance"] and (best_d is None or d < best_d or (d == best_d and cid < best)):
+                best, best_d = cid, d
+    return best, best_d
+
+def fingerprints_path(root=None):
+    return os.path.join(root or DATA_ROOT, FINGERPRINTS_NAME)
+
+def load_fingerprints(root=None, max_distance=None):
+    index = new_index(max_distance)
+    for item_id, hx in sorted(load_json(fingerprints_path(root), {}).items()):
+        try:
+            index_add(index, item_id, int(hx, 16))
+        except Exception:
+            pass
+    return index
+
+def save_fingerprints(index, root=None):
+    save_json(fingerprints_path(root), {k: f"{v:016x}" for k, v in sorted(index["fp"].items())}, compact=True)
+
+def apply_policy(index, item, policy=None):
+    """
+    入库前调用：返回 False 表示按 drop 策略丢弃；link 策略下会就地改写 item。
+    非重复条目的指纹加入索引。
+    """
+    policy = policy or NEARDUP_POLICY
+    if policy == "off" or item.get("duplicate_of"):
+        return True
+    sig = simhash(item.get("content_text") or "")
+    if sig is None:
+        return True
+    cid, d = index_query(index, sig, exclude=item["id"])
+    if cid is None:
+        index_add(index, item["id"], sig)
+        return True
+    print(f"  near-duplicate of {cid} (distance={d}): {item.get('url')}")
+    if policy == "drop":
+        return False
+    link_item(item, cid)
+    return True
+
+def link_item(item, canonical_id):
+    item["duplicate_of"] = canonical_id
+    item["content_text"] = ""
+    item["content_html"] = ""
+    item["can_publish_fulltext"] = False
+
+def scan(max_distance=None, root=None):
+    """
+    全量扫描：按发布时间从早到晚建索引，最早出现的条目作为规范条目。
+    返回 (新索引, {重复 id: 规范 id})。
+    """
+    index = new_index(max_distance)
+    items = []
+    for it in get_store(root).iter_items():
+        if it.get("duplicate_of"):
+            continue
+        sig = simhash(it.get("content_text") or "")
+        if sig is not None:
+            items.append((it.get("published_at") or "", it["id"], sig))
+    dups = {}
+    for _, item_id, sig in sorted(items):
+        cid, _ = index_query(index, sig, exclude=item_id)
+        if cid is None:
+            index_add(index, item_id, sig)
+        else:
+            dups[item_id] = cid
+    return index, dups
+
+def apply_scan(dups, policy=None, root=None):
+    """把扫描结果按策略写回存储，返回 (处理条数, 节省的正文字节数)。"""
+    policy = policy or NEARDUP_POLICY
+    store = get_store(root)
+    found = store.get(sorted(dups))
+    saved = sum(len((it.get("content_html") or "").encode("utf-8")) + len((it.get("content_text") or "").encode("utf-8"))
+                for it in found.values())
+    if policy == "drop":
+        # drop 掉的 id 仍保留在去重集合中，避免再次抓取
+        store.delete(found)
+    else:
+        for i, it in found.items():
+            link_item(it, dups[i])
+        store.put(found.values())
+    store.flush()
+    return len(found), saved
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m scripts.neardup")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_scan = sub.add_parser("scan", help="全量查找近重复（默认只列出）")
+    p_scan.add_argument("--apply", action="store_true", help="按 NEARDUP_POLICY 写回月份文件，并重建 fingerprints.json")
+    p_scan.add_argument("--rebuild", action="store_true", help="用扫描结果重建 fingerprints.json（不改月份文件）")
+    p_scan.add_argument("--policy", choices=["link", "drop"], default=None)
+    p_scan.add_argument("--max-distance", type=int, default=None)
+    args = ap.parse_args(argv)
+
+    index, dups = scan(args.max_distance)
+    clusters = {}
+    for d, c in dups.items():
+        clusters.setdefault(c, []).append(d)
+    for c in sorted(clusters):
+        print(f"{c} <- {', '.join(sorted(clusters[c]))}")
+    print(f"[neardup] fingerprints={len(index['fp'])} duplicates={len(dups)} clusters={len(clusters)}")
+    if args.apply or args.rebuild:
+        save_fingerprints(index)
+        print(f"[neardup] rebuilt {FINGERPRINTS_NAME}")
+    if args.apply and dups:
+        touched, saved = apply_scan(dups, args.policy)
+        print(f"[neardup] applied policy={args.policy or NEARDUP_POLICY}: items={touched} body_bytes_saved={saved}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+normalize.py
+URL 规范化与日期解析（热路径）：
+- 正则预编译；canonicalize_url 带有界 LRU 缓存（同一 URL 在 RSS/Sitemap/去重间反复出现）
+- 日期快速路径：ISO-8601 走 datetime.fromisoformat，RFC-822（数字时区或 GMT/UT/Z）走 email.utils，
+  其余回退 dateutil；结果与 dateutil 一致（时区缩写如 EST 仍交给 dateutil，保持原有语义）
+- 批量接口：canonicalize_urls / parse_datetimes / to_iso_many
+"""
+import re
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+URL_CACHE_SIZE = 65536
+DATE_CACHE_SIZE = 65536
+
+TRACKING_PARAMS = frozenset({
+    "utm_source", "utm_medium", "utm_campaign", "utm_term", "utm_content", "utm_id",
+    "mbid", "partner", "ncid", "cmpid", "icid", "ref", "refsrc", "oref", "_hsmi", "_hsenc",
+    "fbclid", "gclid", "smid", "emc", "share", "s_cid", "sref", "rss", "output", "mod",
+    "algo", "variant"
+})
+
+_HOST_PREFIX = re.compile(r"^(m|amp|www)\.")
+_WWW = re.compile(r"^www\.")
+_TRAILING_SLASHES = re.compile(r"/+$")
+_AMP_SUFFIX = re.compile(r"/amp/?$")
+
+# YYYY-MM-DD[(T| )HH:MM[:SS[.ffffff]]][Z|±HH:MM|±HHMM]
+_ISO = re.compile(
+    r"^\d{4}-\d{2}-\d{2}"
+    r"(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d{1,6})?)?(?:Z|[+-]\d{2}:?\d{2})?)?$"
+)
+# RFC-822：仅接受数字时区或 GMT/UT/UTC/Z，其他缩写交给 dateutil
+_RFC822 = re.compile(
+    r"^(?:[A-Za-z]{3},\s*)?\d{1,2}\s+[A-Za-z]{3}\s+\d{4}\s+\d{1,2}:\d{2}(?::\d{2})?\s+"
+    r"(?:[+-]\d{4}|GMT|UTC?|Z)$"
+)
+
+def domain_of(url: str) -> str:
+    try:
+        return _WWW.sub("", urlparse(url).netloc.lower())
+    except Exception:
+        return ""
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def canonicalize_url(u: str) -> str:
+    try:
+        parts = urlparse(u.strip())
+        netloc = _HOST_PREFIX.sub("", parts.netloc.lower())
+        path = _TRAILING_SLASHES.sub("", parts.path)
+        path = _AMP_SUFFIX.sub("", path).replace("/amp/", "/")
+        query = parts.query
+        if query:
+            q = [(k, v) for (k, v) in parse_qsl(query, keep_blank_values=True)
+                 if k.lower() not in TRACKING_PARAMS and v.lower() != "amp"]
+            query = urlencode(q, doseq=True)
+        return urlunparse(("https", netloc, path, "", query, ""))
+    except Exception:
+        return u
+
+def canonicalize_urls(urls):
+    return [canonicalize_url(u) for u in urls]
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_datetime(s: str) -> datetime:
+    """与 dateutil.parser.parse 结果一致，常见格式走标准库快速路径；解析失败抛异常。"""
+    t = s.strip()
+    if _ISO.match(t):
+        if t.endswith("Z"):
+            t = t[:-1] + "+00:00"
+        try:
+            return datetime.fromisoformat(t)
+        except ValueError:
+            pass
+    elif _RFC822.match(t):
+        try:
+            dt = parsedate_to_datetime(t)
+            # "-0000" 时 email.utils 返回 naive，dateutil 视为 UTC
+            return dt if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)
+        except (TypeError, ValueError):
+            pass
+    # 其余格式交给 dateutil（导入较慢，只在需要时加载）
+    from dateutil import parser as dtparser
+    return dtparser.parse(s)
+
+def parse_datetimes(values, default=None):
+    out = []
+    for v in values:
+        try:
+            out.append(parse_datetime(v))
+        except Exception:
+            out.append(default)
+    return out
+
+def to_iso(dt) -> str:
+    if isinstance(dt, str):
+        dt = parse_datetime(dt)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).isoformat()
+
+def to_iso_many(values, default=""):
+    out = []
+    for v in values:
+        try:
+            out.append(to_iso(v))
+        except Exception:
+            out.append(default)
+    return out
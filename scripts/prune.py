@@ -1,46 +1,38 @@
 # -*- coding: utf-8 -*-
-import os, json
-from scripts.utils import DATA_ROOT, DEDUP_FILE, INDEX_FILE, load_json, save_json, update_index_indexfile
-
-def monthly_files():
-    for y in sorted(os.listdir(DATA_ROOT)):
-        ydir = os.path.join(DATA_ROOT, y)
-        if not os.path.isdir(ydir): continue
-        for m in sorted(os.listdir(ydir)):
-            if not m.endswith(".json"): continue
-            yield os.path.join(ydir, m)
+import argparse
+from scripts import journal
+from scripts.store import get_store
 
 def keep_item(it):
     # 保留条件：
     # 1) 来自 GitHub 导入（source 以 "GitHub: " 开头），或
-    # 2) 有站内可读全文（content_html 或 content_text 非空）
+    # 2) 有站内可读全文（content_html 或 content_text 非空），或
+    # 3) 近重复关联条目（duplicate_of），保留以维持关联
     src = (it.get("source") or "")
     if src.startswith("GitHub: "):
         return True
+    if it.get("duplicate_of"):
+        return True
     if (it.get("content_html") or "").strip():
         return True
     if (it.get("content_text") or "").strip():
         return True
     return False
 
-def main():
-    print("[prune] start")
-    total_before = 0
-    total_after = 0
-    ids = []
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m scripts.prune",
+                                 description="删除没有站内全文的条目，重建去重集合与 index")
+    return ap.parse_args(argv)
 
-    for path in monthly_files():
-        arr = load_json(path, [])
-        total_before += len(arr)
-        kept = [it for it in arr if keep_item(it)]
-        total_after += len(kept)
-        save_json(path, kept)
-        ids.extend([it["id"] for it in kept])
-
-    # 重建去重文件
-    save_json(DEDUP_FILE, sorted(list(set(ids))))
-    # 重建 index
-    update_index_indexfile()
+def main(argv=None):
+    parse_args(argv)
+    print("[prune] start")
+    # 先把未折叠的入库日志并入月份文件
+    journal.compact()
+    store = get_store()
+    total_before, total_after = store.prune(keep_item)
+    # 去重集合按保留的条目重建，index 全量重建
+    store.flush(full_index=True)
 
     print(f"[prune] before={total_before} after={total_after} removed={total_before-total_after}")
     return 0
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+reextract.py
+对已入库条目重新抽取全文（调整抽取档案或升级抽取器之后使用）：
+  python -m scripts.reextract [--month YYYY-MM] [--source NAME] [--all] [--limit N] [--dry-run]
+
+- 默认只处理没有站内全文的条目（prune 会删除它们，重抽一次再决定）；--all 时处理全部条目
+- 只处理来自 SOURCES 站点的条目，跳过 GitHub 导入与近重复关联条目
+- 正文确有变化的条目才写回，只重写涉及的月份；同时更新 validators.json
+"""
+import sys, time, argparse
+from scripts.utils import source_conf_for, report_fetch_stats
+from scripts import journal
+from scripts.store import get_store, has_fulltext
+from scripts.refresh import load_validators, save_validators, record_validators
+
+def candidates(store, months=None, source=None, all_items=False):
+    for key in (months or store.months()):
+        for it in store.month_items(key):
+            if it.get("duplicate_of") or not source_conf_for(it["url"]):
+                continue
+            if source and it.get("source") != source:
+                continue
+            if all_items or not has_fulltext(it):
+                yield it
+
+def reextract_item(it, vmap):
+    """返回 (状态, 更新后的条目或 None)。状态：changed / unchanged / empty / failed。"""
+    from scripts.connectors.fulltext import extract_fulltext
+    try:
+        data = extract_fulltext(it["url"])
+    except Exception as e:
+        print(f"  reextract failed: {it['url']} ({e})")
+        return "failed", None
+    if not data:
+        return "failed", None
+    record_validators(vmap, it["id"], data)
+    text, html_ = data.get("content_text") or "", data.get("content_html") or ""
+    if not (text or html_):
+        return "empty", None
+    if (text, html_) == (it.get("content_text") or "", it.get("content_html") or ""):
+        return "unchanged", None
+    new = dict(it, content_text=text, content_html=html_, can_publish_fulltext=True)
+    if data.get("cover_image") and not new.get("cover_image"):
+        new["cover_image"] = data["cover_image"]
+    return "changed", new
+
+def reextract(months=None, source=None, all_items=False, limit=None, dry_run=False, root=None):
+    store = get_store(root)
+    vmap = load_validators(root)
+    counts = {"checked": 0, "changed": 0, "unchanged": 0, "empty": 0, "failed": 0}
+    changed = []
+    for it in candidates(store, months, source, all_items):
+        if limit and counts["checked"] >= limit:
+            break
+        counts["checked"] += 1
+        status, new = reextract_item(it, vmap)
+        counts[status] += 1
+        if new is not None:
+            print(f"  changed: {it['url']}")
+            changed.append(new)
+        time.sleep(0.3)
+
+    written = []
+    if changed and not dry_run:
+        written = store.put(changed)
+        store.flush()
+    if counts["checked"] and not dry_run:
+        save_validators(vmap, root)
+    return counts, written
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m scripts.reextract")
+    ap.add_argument("--month", action="append", help="只处理指定月份 YYYY-MM，可重复")
+    ap.add_argument("--source", help="只处理该来源（条目的 source 字段，如 WIRED）")
+    ap.add_argument("--all", action="store_true", help="包括已有全文的条目（默认只处理没有全文的）")
+    ap.add_argument("--limit", type=int, default=None, help="最多处理多少条")
+    ap.add_argument("--dry-run", action="store_true", help="只统计，不写回")
+    args = ap.parse_args(argv)
+
+    # 先把未折叠的入库日志并入月份文件
+    journal.compact()
+    counts, months = reextract(args.month, args.source, args.all, args.limit, args.dry_run)
+    report_fetch_stats()
+    print("[reextract] " + " ".join(f"{k}={v}" for k, v in counts.items()) + f" months={','.join(months) or '-'}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
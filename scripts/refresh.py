@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+refresh.py
+复查近期文章是否有更新（条件请求，只重抽取真正变化的页面）：
+  python -m scripts.refresh [--days 7] [--limit N] [--dry-run]
+
+- 入库时把页面的 ETag / Last-Modified / 内容哈希记入 docs/data/validators.json（按 id）
+- 复查发布时间在窗口（REFRESH_WINDOW_DAYS，默认 7 天）内的条目：
+  带 If-None-Match / If-Modified-Since 请求，304 即未变；
+  返回 200 但内容哈希与上次相同也视为未变，不做抽取；
+  哈希不同才重新抽取，正文确有变化的条目才写回，只重写涉及的月份
+- 没有记录的旧条目第一次复查时只下载页面、记录 ETag / Last-Modified / 内容哈希作为基准（状态 baseline），
+  不重抽取、不改写条目（旧条目的正文由旧流程生成，直接比较会误判为变化）
+- 超过两个窗口未再见到的记录自动清理
+"""
+import os, sys, time, argparse
+from datetime import datetime, timezone, timedelta
+from scripts.utils import (
+    DATA_ROOT, load_json, save_json, to_iso, parse_datetime, fetch_html,
+    source_conf_for, report_fetch_stats
+)
+from scripts import journal
+from scripts.store import get_store
+
+VALIDATORS_NAME = "validators.json"
+REFRESH_WINDOW_DAYS = float(os.getenv("REFRESH_WINDOW_DAYS") or 7)
+
+def validators_path(root=None):
+    return os.path.join(root or DATA_ROOT, VALIDATORS_NAME)
+
+def load_validators(root=None):
+    return load_json(validators_path(root), {})
+
+def save_validators(vmap, root=None):
+    save_json(validators_path(root), {k: vmap[k] for k in sorted(vmap)}, compact=True)
+
+def record_validators(vmap, item_id, data, now=None):
+    """data 为 extract_fulltext 的结果（含 etag / last_modified / body_sha256）。"""
+    if not data.get("body_sha256"):
+        return
+    vmap[item_id] = {
+        "etag": data.get("etag") or "",
+        "last_modified": data.get("last_modified") or "",
+        "sha256": data["body_sha256"],
+        "seen_at": to_iso(now or datetime.now(timezone.utc)),
+    }
+
+def conditional_headers(v):
+    h = {}
+    if v and v.get("etag"):
+        h["If-None-Match"] = v["etag"]
+    if v and v.get("last_modified"):
+        h["If-Modified-Since"] = v["last_modified"]
+    return h
+
+def candidates(store, since_iso):
+    """窗口内可复查的条目：来自 SOURCES 站点、非近重复关联条目。"""
+    since_key = since_iso[:7]
+    for key in reversed(store.months()):
+        if key < since_key:
+            break
+        for it in store.month_items(key):
+            if (it.get("published_at") or "") >= since_iso and not it.get("duplicate_of") and source_conf_for(it["url"]):
+                yield it
+
+def _updated_at(last_modified, now):
+    try:
+        return to_iso(parse_datetime(last_modified)) if last_modified else to_iso(now)
+    except Exception:
+        return to_iso(now)
+
+def refresh_item(it, vmap, now):
+    """复查单个条目；返回 (状态, 更新后的条目或 None)。状态：not_modified / baseline / same_body / same_content / changed / failed。"""
+    # 抽取依赖 bs4 等较重的模块；只用到 validators 读写的 fetch_daily / shard 不必加载
+    from scripts.connectors.fulltext import extract_from_html, body_hash
+    v = vmap.get(it["id"])
+    try:
+        raw, r = fetch_html(it["url"], timeout=60, headers=conditional_headers(v))
+    except Exception as e:
+        print(f"  refresh failed: {it['url']} ({e})")
+        return "failed", None
+    if r.status_code == 304:
+        if v: v["seen_at"] = to_iso(now)
+        return "not_modified", None
+    if raw is None:
+        return "failed", None
+    data = {"etag": r.headers.get("ETag") or "", "last_modified": r.headers.get("Last-Modified") or "",
+            "body_sha256": body_hash(raw)}
+    record_validators(vmap, it["id"], data, now)
+    if v is None:
+        return "baseline", None
+    if v.get("sha256") == data["body_sha256"]:
+        return "same_body", None
+    out = extract_from_html(raw, r.url or it["url"])
+    if (out["content_text"], out["content_html"]) == (it.get("content_text") or "", it.get("content_html") or ""):
+        return "same_content", None
+    new = dict(it)
+    new["content_text"] = out["content_text"]
+    new["content_html"] = out["content_html"]
+    if out.get("cover_image") and not new.get("cover_image"):
+        new["cover_image"] = out["cover_image"]
+    if new["content_text"] or new["content_html"]:
+        new["can_publish_fulltext"] = True
+    new["updated_at"] = _updated_at(data["last_modified"], now)
+    return "changed", new
+
+def refresh(days=None, limit=None, dry_run=False, root=None):
+    now = datetime.now(timezone.utc)
+    days = REFRESH_WINDOW_DAYS if days is None else days
+    since_iso = to_iso(now - timedelta(days=days))
+    store = get_store(root)
+    vmap = load_validators(root)
+    counts = {"checked": 0, "not_modified": 0, "baseline": 0, "same_body": 0, "same_content": 0, "changed": 0, "failed": 0}
+    changed = []
+    for it in candidates(store, since_iso):
+        if limit and counts["checked"] >= limit:
+            break
+        counts["checked"] += 1
+        status, new = refresh_item(it, vmap, now)
+        counts[status] += 1
+        if new is not None:
+            print(f"  changed: {it['url']}")
+            changed.append(new)
+        time.sleep(0.3)
+
+    months = []
+    if changed and not dry_run:
+        months = store.put(changed)
+        store.flush()
+    stale = to_iso(now - timedelta(days=2 * days))
+    vmap = {k: v for k, v in vmap.items() if (v.get("seen_at") or "") >= stale}
+    if not dry_run:
+        save_validators(vmap, root)
+    return counts, months
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m scripts.refresh")
+    ap.add_argument("--days", type=float, default=None, help=f"复查最近多少天发布的条目（默认 REFRESH_WINDOW_DAYS={REFRESH_WINDOW_DAYS:g}）")
+    ap.add_argument("--limit", type=int, default=None, help="最多复查多少条")
+    ap.add_argument("--dry-run", action="store_true", help="只统计，不写回")
+    args = ap.parse_args(argv)
+
+    # 先把未折叠的入库日志并入月份文件
+    journal.compact()
+    counts, months = refresh(args.days, args.limit, args.dry_run)
+    report_fetch_stats()
+    print("[refresh] " + " ".join(f"{k}={v}" for k, v in counts.items()) + f" months={','.join(months) or '-'}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+shard.py
+分片抓取与确定性合并：
+- --shard i/n（i 从 0 开始）：按来源 key 的哈希把 SOURCES / GITHUB_REPOS 分给 n 个 worker
+- 每个 worker 写自包含的 partial 目录：按月的新条目、新增去重 id（dedup.json）、metrics.json
+  以及 worker 新增或改动的指纹、别名与 validators（只有增量，合并时按条目叠加到主目录）
+- merge：把任意数量的 partial 合并进 docs/data；同 id 冲突按固定规则裁决，
+  只重写受影响的月份与 index，重复合并结果不变（幂等）
+
+用法：
+  python -m scripts.fetch_daily --shard 0/4 --out partials/shard-0-of-4
+  python -m scripts.shard plan 4
+  python -m scripts.shard merge partials/shard-*
+"""
+import os, sys, json, shutil, argparse
+from itertools import chain
+from scripts.config import SOURCES, GITHUB_REPOS
+from scripts.journal import read_journal
+from scripts.neardup import fingerprints_path
+from scripts.feed_schedule import load_schedule, save_schedule
+from scripts.work_queue import stats_path, load_stats, save_stats, merge_stats
+from scripts.aliases import load_aliases, save_aliases, add_alias
+from scripts.refresh import load_validators, save_validators
+from scripts.utils import (
+    DATA_ROOT, sha1, load_json, save_json, iter_month_keys, iter_month, load_dedup, save_dedup
+)
+from scripts.store import get_store
+
+PARTIALS_ROOT = "partials"
+METRICS_NAME = "metrics.json"
+
+def parse_shard(spec):
+    """'i/n' -> (i, n)；空值返回 None。"""
+    if not spec:
+        return None
+    try:
+        i, n = (int(x) for x in str(spec).split("/", 1))
+    except Exception:
+        raise ValueError(f"invalid shard spec: {spec!r} (expected i/n)")
+    if n < 1 or not (0 <= i < n):
+        raise ValueError(f"invalid shard spec: {spec!r} (need 0 <= i < n)")
+    return i, n
+
+def shard_of(key: str, n: int) -> int:
+    return int(sha1(key)[:8], 16) % n
+
+def in_shard(key: str, shard) -> bool:
+    return shard is None or shard_of(key, shard[1]) == shard[0]
+
+def github_key(cfg) -> str:
+    return f"github:{cfg['owner']}/{cfg['repo']}"
+
+def select_sources(shard):
+    return {k: v for k, v in SOURCES.items() if in_shard(k, shard)}
+
+def select_github_repos(shard):
+    return [cfg for cfg in GITHUB_REPOS if in_shard(github_key(cfg), shard)]
+
+def partial_root(shard, out=None):
+    if out:
+        return out
+    i, n = shard
+    return os.path.join(PARTIALS_ROOT, f"shard-{i}-of-{n}")
+
+def reset_partial(root):
+    """worker 开始前清空自己的 partial 目录，避免叠加上一次的输出。"""
+    if os.path.isdir(root):
+        shutil.rmtree(root)
+    os.makedirs(root, exist_ok=True)
+
+def write_partial(root, new_ids, metrics):
+    save_dedup(new_ids, root)
+    save_json(os.path.join(root, METRICS_NAME), metrics)
+
+def _rank(it):
+    # 冲突裁决：有全文 > 更新时间更晚 > 正文更长 > 序列化字典序（兜底保证确定性）
+    has_full = bool(it.get("can_publish_fulltext")) and bool(it.get("content_html") or it.get("content_text"))
+    return (
+        has_full,
+        it.get("updated_at") or "",
+        len(it.get("content_text") or ""),
+        json.dumps(it, ensure_ascii=False, sort_keys=True),
+    )
+
+def pick(a, b):
+    return a if _rank(a) >= _rank(b) else b
+
+def merge_partials(paths, root=None):
+    root = root or DATA_ROOT
+    paths = sorted(set(os.path.normpath(p) for p in paths))
+
+    incoming, new_ids, metrics = {}, set(), []
+    for p in paths:
+        if not os.path.isdir(p):
+            print(f"[merge] skip missing partial: {p}")
+            continue
+        # worker 中断时未折叠的日志同样参与合并
+        for it in chain((it for (y, m) in iter_month_keys(p) for it in iter_month(y, m, p)), read_journal(p)):
+            cur = incoming.get(it["id"])
+            incoming[it["id"]] = it if cur is None else pick(cur, it)
+        # worker 接受但未入库的 id（如 NEARDUP_POLICY=drop 丢弃的转载稿）只记录在 partial 的 dedup.json 中
+        new_ids |= load_dedup(p)
+        metrics.append(load_json(os.path.join(p, METRICS_NAME), {}))
+
+    report = {"partials": len(metrics), "incoming": len(incoming), "added": 0, "replaced": 0, "months": []}
+    store = get_store(None if root == DATA_ROOT else root)
+    if incoming:
+        # 与库中已有记录按同一规则裁决，只写入胜出的新版本
+        existing = store.get(sorted(incoming))
+        winners = []
+        for i in sorted(incoming):
+            old = existing.get(i)
+            if old is None:
+                report["added"] += 1
+            elif pick(old, incoming[i]) is old:
+                continue
+            else:
+                report["replaced"] += 1
+            winners.append(incoming[i])
+        report["months"] = store.put(winners)
+    if incoming or new_ids:
+        store.add_known(set(incoming) | new_ids)
+        store.flush()
+
+    # partial 中的指纹、别名与 validators 只有 worker 的增量，逐条叠加，不会恢复主目录已删除的条目
+    fps = load_json(fingerprints_path(root), {})
+    merged_fps = dict(fps)
+    for p in paths:
+        merged_fps.update(load_json(fingerprints_path(p), {}))
+    if merged_fps != fps:
+        save_json(fingerprints_path(root), dict(sorted(merged_fps.items())), compact=True)
+    amap = load_aliases(root)
+    merged_aliases = dict(amap)
+    for p in paths:
+        for a, c in sorted(load_aliases(p).items()):
+            add_alias(merged_aliases, a, c)
+    if merged_aliases != amap:
+        save_aliases(merged_aliases, root)
+    vmap = load_validators(root)
+    merged_v = dict(vmap)
+    for p in paths:
+        merged_v.update(load_validators(p))
+    if merged_v != vmap:
+        save_validators(merged_v, root)
+    # 各分片的 feed 互不重叠，直接按 feed 覆盖轮询记录
+    sched = load_schedule(root)
+    merged_sched = dict(sched)
+    for p in paths:
+        merged_sched.update(load_schedule(p))
+    if merged_sched != sched:
+        save_schedule(merged_sched, root)
+    parts = [load_stats(p) for p in paths if os.path.exists(stats_path(p))]
+    if parts:
+        stats = load_stats(root)
+        merged_stats = merge_stats(stats, parts)
+        if merged_stats != stats:
+            save_stats(merged_stats, root)
+    for mt in metrics:
+        if mt:
+            print(f"[merge] shard {mt.get('shard')} {mt.get('kind')}: added={mt.get('total_added')} elapsed={mt.get('elapsed_sec')}s")
+    return report
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m scripts.shard")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_plan = sub.add_parser("plan", help="列出 n 个分片各自负责的来源")
+    p_plan.add_argument("n", type=int)
+    p_merge = sub.add_parser("merge", help="把 partial 目录合并进 docs/data")
+    p_merge.add_argument("partials", nargs="+")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "plan":
+        for i in range(args.n):
+            keys = list(select_sources((i, args.n))) + [github_key(c) for c in select_github_repos((i, args.n))]
+            print(f"{i}/{args.n}: {', '.join(keys) or '-'}")
+        return 0
+
+    report = merge_partials(args.partials)
+    print(f"[merge] partials={report['partials']} incoming={report['incoming']} "
+          f"added={report['added']} replaced={report['replaced']} months={','.join(report['months']) or '-'}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
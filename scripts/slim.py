@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+slim.py
+正文 HTML 精简（在 transform_content_html 之后执行，配置见 scripts.config.SLIM_HTML）：
+- 标签白名单：包装层（div/span/section/html/body …）去壳保留内容，脚本/表单等整体删除
+- 属性白名单：去掉 class/id/style/data-*/aria-* 等
+- 删除不含文字与媒体的空元素、注释；合并连续空白（pre 内除外）
+- srcset 只保留 srcset_max 档；同一图片（忽略尺寸/质量参数）只保留第一次出现
+
+批量模式：python -m scripts.slim [--apply] [--month YYYY-MM]
+按来源统计正文体积变化，并按月份估算前端加载（gzip 后下载耗时、正文 DOM 元素数）的变化。
+"""
+import re, sys, gzip, argparse
+from urllib.parse import urlsplit, parse_qsl
+from bs4 import BeautifulSoup, Comment
+from scripts.config import SLIM_HTML
+from scripts.utils import dumps_json
+
+# 这些元素本身就是内容，即使没有文字也保留
+_KEEP_EMPTY = {"br", "hr", "img", "source", "video", "audio", "td", "th", "tr"}
+_MEDIA = ["img", "video", "audio", "source", "picture"]
+# 这些容器内部的纯空白文本节点没有意义
+_BLOCK_PARENTS = {"[document]", "ul", "ol", "dl", "table", "thead", "tbody", "tfoot", "tr", "figure", "picture",
+                  "blockquote", "video", "audio"}
+_WS = re.compile(r"\s+")
+# 图片 URL 中只表示尺寸/质量的查询参数，去重时忽略
+_SIZE_PARAMS = {"w", "h", "q", "width", "height", "quality", "dpr", "fit", "resize", "auto", "fm", "format"}
+# 估算前端下载耗时用的带宽（bit/s）
+BANDWIDTHS = {"3g": 1.6e6, "4g": 9e6}
+
+def _cap_srcset(value, n):
+    cands = [c.strip() for c in value.split(",") if c.strip()]
+    if n <= 0 or len(cands) <= n:
+        return ", ".join(cands)
+    def width(c):
+        parts = c.split()
+        try:
+            return float(parts[1].rstrip("wx")) if len(parts) > 1 else 0.0
+        except ValueError:
+            return 0.0
+    cands.sort(key=width)
+    if n == 1:
+        return cands[-1]
+    step = (len(cands) - 1) / (n - 1)
+    return ", ".join(cands[round(i * step)] for i in range(n))
+
+def _image_key(src):
+    """同一图片的不同尺寸只保留一次：去掉尺寸/质量参数，其余查询参数（如图片代理的 url=、src=）保留。"""
+    p = urlsplit(src or "")
+    if not p.path:
+        return None
+    query = tuple(sorted((k, v) for k, v in parse_qsl(p.query, keep_blank_values=True) if k.lower() not in _SIZE_PARAMS))
+    return (p.netloc.lower(), p.path, query)
+
+def slim_content_html(html_text: str, conf=None) -> str:
+    conf = conf or SLIM_HTML
+    if not html_text or not conf.get("enabled", True):
+        return html_text
+    tags = set(conf.get("tags") or ())
+    attrs = conf.get("attrs") or {}
+    common = set(attrs.get("*") or ())
+    srcset_max = int(conf.get("srcset_max") or 0)
+
+    soup = BeautifulSoup(html_text, "html.parser")
+    for c in soup.find_all(string=lambda s: isinstance(s, Comment)):
+        c.extract()
+    for el in soup.find_all(list(conf.get("drop_tags") or ())):
+        el.decompose()
+
+    seen_images = set()
+    for el in soup.find_all(True):
+        if el.name not in tags:
+            el.unwrap()
+            continue
+        allowed = common | set(attrs.get(el.name) or ())
+        el.attrs = {k: v for k, v in el.attrs.items() if k in allowed}
+        if el.name == "a" and el.get("href", "").strip().lower().startswith("javascript:"):
+            del el["href"]
+        if el.get("srcset") and srcset_max:
+            el["srcset"] = _cap_srcset(el["srcset"], srcset_max)
+        if el.name == "img":
+            key = _image_key(el.get("src"))
+            if key in seen_images:
+                el.decompose()
+                continue
+            if key:
+                seen_images.add(key)
+
+    # 子元素先于父元素处理，空的 <p><span></span></p> 可一次删净
+    for el in reversed(soup.find_all(True)):
+        if el.name in _KEEP_EMPTY or el.find(_MEDIA):
+            continue
+        if not el.get_text(strip=True):
+            el.decompose()
+
+    for s in soup.find_all(string=True):
+        if s.find_parent("pre"):
+            continue
+        text = _WS.sub(" ", s)
+        if text == " " and (s.parent is None or s.parent.name in _BLOCK_PARENTS):
+            s.extract()
+        elif text != s:
+            s.replace_with(text)
+    return str(soup).strip()
+
+# ---- 批量模式 ----
+
+def _gz_size(items):
+    return len(gzip.compress(dumps_json(items, compact=True), compresslevel=9, mtime=0))
+
+def _elements(html_text):
+    return len(re.findall(r"<[a-zA-Z]", html_text or ""))
+
+def slim_store(months=None, apply=False, conf=None):
+    from scripts.store import get_store
+    store = get_store()
+    per_source, per_month, changed_total = {}, {}, 0
+    for key in (months or store.months()):
+        items = store.month_items(key)
+        slimmed, changed = [], []
+        for it in items:
+            before = it.get("content_html") or ""
+            after = slim_content_html(before, conf) if before else before
+            new = dict(it, content_html=after) if after != before else it
+            slimmed.append(new)
+            if new is not it:
+                changed.append(new)
+            st = per_source.setdefault(it.get("source") or "-", [0, 0, 0, 0, 0])
+            st[0] += 1
+            st[1] += len(before.encode("utf-8"))
+            st[2] += len(after.encode("utf-8"))
+            st[3] += _elements(before)
+            st[4] += _elements(after)
+        per_month[key] = (len(items), _gz_size(items), _gz_size(slimmed))
+        changed_total += len(changed)
+        if apply and changed:
+            store.put(changed)
+    if apply and changed_total:
+        store.flush()
+    return per_source, per_month, changed_total
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m scripts.slim")
+    ap.add_argument("--apply", action="store_true", help="写回月份文件（默认只统计）")
+    ap.add_argument("--month", action="append", help="只处理指定月份 YYYY-MM，可重复")
+    args = ap.parse_args(argv)
+
+    per_source, per_month, changed = slim_store(args.month, args.apply)
+    print(f"  {'source':<30}{'items':>6}{'html before':>13}{'after':>10}{'saved':>8}{'elements/item':>16}")
+    tb = ta = 0
+    for src in sorted(per_source):
+        n, b, a, eb, ea = per_source[src]
+        tb += b; ta += a
+        pct = 100.0 * (b - a) / b if b else 0.0
+        print(f"  {src[:29]:<30}{n:>6}{b / 1024:>11.0f}KB{a / 1024:>8.0f}KB{pct:>7.1f}%{eb / n:>8.0f} -> {ea / n:<6.0f}")
+    print(f"[slim] content_html {tb / 1024:.0f}KB -> {ta / 1024:.0f}KB ({100.0 * (tb - ta) / tb if tb else 0:.1f}% saved), items changed={changed}")
+    # 前端加载：每个月份文件 gzip 后的下载耗时
+    for key, (n, gb, ga) in sorted(per_month.items()):
+        est = "  ".join(f"{name} {gb * 8 / bw:.2f}s -> {ga * 8 / bw:.2f}s" for name, bw in BANDWIDTHS.items())
+        print(f"  {key}: items={n} gz {gb / 1024:.0f}KB -> {ga / 1024:.0f}KB  download {est}")
+    if not args.apply:
+        print("[slim] dry run; pass --apply to rewrite month files")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
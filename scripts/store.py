@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+"""
+store.py
+文章存储后端（STORE_BACKEND=json|sqlite，默认 json）：
+- JsonStore：docs/data 下的月份文件 + dedup.json + index.json（原有布局）
+- SqliteStore：标准库 sqlite3（WAL），articles 表按 id / month / source 建索引，
+  正文单独放在 bodies 表；批量写入在一个事务内完成。
+  docs/data 下的静态 JSON 由 export 生成，且只重写发生变化的月份
+
+两者接口一致：
+  known_ids / has / add_known / months / month_items / iter_items / get / put / delete / prune / flush
+
+用法：
+  python -m scripts.store import          # 从现有 docs/data 导入 SQLite
+  python -m scripts.store export [--all]  # 从 SQLite 生成 docs/data
+  python -m scripts.store stats
+"""
+import os, sys, json, sqlite3, argparse
+from scripts.utils import (
+    DATA_ROOT, load_month, iter_month, save_month, remove_month, iter_month_keys, month_of, month_key,
+    load_dedup, save_dedup, update_index_indexfile, write_index
+)
+
+STORE_BACKEND = (os.getenv("STORE_BACKEND") or "json").strip().lower()
+SQLITE_PATH = os.getenv("STORE_SQLITE_PATH") or os.path.join(DATA_ROOT, "store.sqlite")
+BODY_FIELDS = ("content_text", "content_html")
+
+def has_fulltext(it):
+    return bool((it.get("content_html") or "").strip() or (it.get("content_text") or "").strip())
+
+def _split(key):
+    y, m = key.split("-")
+    return int(y), int(m)
+
+class JsonStore:
+    """月份 JSON 文件存储；root 为 None 时即 docs/data（partial 目录同样适用）。"""
+    backend = "json"
+
+    def __init__(self, root=None):
+        self.root = root
+        self._known = None
+        self._known_dirty = False
+        self._changed = set()
+
+    def _known_set(self):
+        if self._known is None:
+            self._known = load_dedup(self.root)
+        return self._known
+
+    def known_ids(self):
+        return set(self._known_set())
+
+    def has(self, item_id):
+        return item_id in self._known_set()
+
+    def add_known(self, ids):
+        known = self._known_set()
+        before = len(known)
+        known.update(ids)
+        self._known_dirty |= len(known) != before
+
+    def months(self):
+        return [month_key(y, m) for (y, m) in iter_month_keys(self.root)]
+
+    def month_items(self, key):
+        return load_month(*_split(key), self.root)
+
+    def iter_items(self):
+        # 逐月流式读取（分段月份逐段），不整体载入月份
+        for key in self.months():
+            yield from iter_month(*_split(key), self.root)
+
+    def _locate(self, ids, hint=()):
+        """返回 {id: 月份}；先查 hint 中的月份，找不全再扫描其余月份。"""
+        want, found = set(ids), {}
+        for key in list(dict.fromkeys(list(hint) + self.months())):
+            if len(found) == len(want):
+                break
+            for it in iter_month(*_split(key), self.root):
+                if it["id"] in want:
+                    found[it["id"]] = key
+        return found
+
+    def get(self, ids):
+        ids = [i for i in ids if self.has(i)]
+        out = {}
+        if not ids:
+            return out
+        loc = self._locate(ids)
+        for key in sorted(set(loc.values())):
+            for it in iter_month(*_split(key), self.root):
+                if loc.get(it["id"]) == key:
+                    out[it["id"]] = it
+        return out
+
+    def put(self, items):
+        """按 id 批量写入（已存在则替换，发布月份变化时从原月份移除），返回变动的月份。"""
+        items = {it["id"]: it for it in items}
+        if not items:
+            return []
+        target = {i: month_key(*month_of(it)) for i, it in items.items()}
+        # 只有已知 id 才可能在别的月份出现
+        moved = self._locate([i for i in items if self.has(i)], hint=sorted(set(target.values())))
+        touched = sorted(set(target.values()) | set(moved.values()))
+        changed = []
+        for key in touched:
+            arr = self.month_items(key)
+            out = [it for it in arr if it["id"] not in items or target[it["id"]] == key]
+            pos = {it["id"]: n for n, it in enumerate(out)}
+            for i, it in items.items():
+                if target[i] != key:
+                    continue
+                if i in pos:
+                    out[pos[i]] = it
+                else:
+                    pos[i] = len(out)
+                    out.append(it)
+            if out != arr:
+                save_month(*_split(key), out, self.root)
+                changed.append(key)
+        self.add_known(items)
+        self._changed.update(changed)
+        return changed
+
+    def delete(self, ids):
+        ids = set(ids)
+        changed = []
+        for key in self.months():
+            arr = self.month_items(key)
+            out = [it for it in arr if it["id"] not in ids]
+            if len(out) != len(arr):
+                save_month(*_split(key), out, self.root)
+                changed.append(key)
+        self._changed.update(changed)
+        return changed
+
+    def prune(self, keep):
+        """删除 keep(it) 为假的条目，并以剩余 id 重建去重集合。返回 (before, after)。"""
+        before = after = 0
+        ids = set()
+        for key in self.months():
+            n, kept = 0, []
+            for it in iter_month(*_split(key), self.root):
+                n += 1
+                if keep(it):
+                    kept.append(it)
+            before += n; after += len(kept)
+            ids.update(it["id"] for it in kept)
+            if len(kept) != n:
+                save_month(*_split(key), kept, self.root)
+                self._changed.add(key)
+        self._known = ids
+        self._known_dirty = True
+        return before, after
+
+    def flush(self, full_index=False):
+        if self._known_dirty:
+            save_dedup(self._known_set(), self.root)
+            self._known_dirty = False
+        if self.root is None:
+            update_index_indexfile(None if full_index else sorted(self._changed))
+        self._changed.clear()
+
+    def close(self):
+        pass
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles(
+    id TEXT PRIMARY KEY,
+    month TEXT NOT NULL,
+    source TEXT NOT NULL,
+    published_at TEXT NOT NULL DEFAULT '',
+    has_fulltext INTEGER NOT NULL DEFAULT 0,
+    duplicate_of TEXT,
+    meta TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_articles_month ON articles(month, published_at);
+CREATE INDEX IF NOT EXISTS idx_articles_source ON articles(source, month);
+CREATE INDEX IF NOT EXISTS idx_articles_fulltext ON articles(has_fulltext);
+CREATE TABLE IF NOT EXISTS bodies(
+    id TEXT PRIMARY KEY REFERENCES articles(id) ON DELETE CASCADE,
+    content_text TEXT NOT NULL DEFAULT '',
+    content_html TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS known_ids(id TEXT PRIMARY KEY) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS dirty(kind TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY(kind, key)) WITHOUT ROWID;
+"""
+
+class SqliteStore:
+    """
+    SQLite 存储。meta 保存去掉正文后的条目 JSON（正文字段以 null 占位以保留字段顺序），
+    导出时与 bodies 拼回原始结构。dirty 表记录待导出的月份与 dedup，进程中断后下次导出仍会补上。
+    """
+    backend = "sqlite"
+
+    def __init__(self, path=None, export_root=None):
+        self.path = path or SQLITE_PATH
+        self.export_root = export_root
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA foreign_keys=ON")
+        self.db.executescript(SCHEMA)
+
+    # ---- 去重集合 ----
+    def known_ids(self):
+        return {r[0] for r in self.db.execute("SELECT id FROM known_ids")}
+
+    def has(self, item_id):
+        return self.db.execute("SELECT 1 FROM known_ids WHERE id=?", (item_id,)).fetchone() is not None
+
+    def add_known(self, ids):
+        with self.db:
+            self._add_known(ids)
+
+    def _add_known(self, ids):
+        cur = self.db.executemany("INSERT OR IGNORE INTO known_ids(id) VALUES (?)", ((i,) for i in ids))
+        if cur.rowcount:
+            self._mark("dedup", "")
+
+    def _mark(self, kind, key):
+        self.db.execute("INSERT OR IGNORE INTO dirty(kind, key) VALUES (?, ?)", (kind, key))
+
+    # ---- 读取 ----
+    def months(self):
+        return [r[0] for r in self.db.execute("SELECT DISTINCT month FROM articles ORDER BY month")]
+
+    @staticmethod
+    def _item(meta, text, html):
+        it = json.loads(meta)
+        it["content_text"] = text or ""
+        it["content_html"] = html or ""
+        return it
+
+    def month_items(self, key):
+        rows = self.db.execute(
+            "SELECT a.meta, b.content_text, b.content_html FROM articles a LEFT JOIN bodies b ON b.id = a.id "
+            "WHERE a.month = ? ORDER BY a.published_at DESC, a.id DESC", (key,))
+        return [self._item(*r) for r in rows]
+
+    def iter_items(self):
+        for key in self.months():
+            yield from self.month_items(key)
+
+    def get(self, ids):
+        ids, out = list(ids), {}
+        for n in range(0, len(ids), 500):
+            chunk = ids[n:n + 500]
+            q = ",".join("?" * len(chunk))
+            for r in self.db.execute(
+                    f"SELECT a.id, a.meta, b.content_text, b.content_html FROM articles a "
+                    f"LEFT JOIN bodies b ON b.id = a.id WHERE a.id IN ({q})", chunk):
+                out[r[0]] = self._item(*r[1:])
+        return out
+
+    def items_without_fulltext(self, month=None):
+        sql = "SELECT a.meta, b.content_text, b.content_html FROM articles a LEFT JOIN bodies b ON b.id = a.id WHERE a.has_fulltext = 0"
+        args = ()
+        if month:
+            sql += " AND a.month = ?"; args = (month,)
+        return [self._item(*r) for r in self.db.execute(sql, args)]
+
+    def source_items(self, source, month):
+        rows = self.db.execute(
+            "SELECT a.meta, b.content_text, b.content_html FROM articles a LEFT JOIN bodies b ON b.id = a.id "
+            "WHERE a.source = ? AND a.month = ? ORDER BY a.published_at DESC, a.id DESC", (source, month))
+        return [self._item(*r) for r in rows]
+
+    # ---- 写入 ----
+    def put(self, items):
+        items = {it["id"]: it for it in items}
+        changed = set()
+        with self.db:
+            for i, it in items.items():
+                key = month_key(*month_of(it))
+                old = self.db.execute("SELECT month FROM articles WHERE id=?", (i,)).fetchone()
+                if old: changed.add(old[0])
+                changed.add(key)
+                meta = dict(it)
+                for f in BODY_FIELDS:
+                    meta[f] = None
+                self.db.execute(
+                    "INSERT OR REPLACE INTO articles(id, month, source, published_at, has_fulltext, duplicate_of, meta) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (i, key, it.get("source") or "", it.get("published_at") or "", int(has_fulltext(it)),
+                     it.get("duplicate_of"), json.dumps(meta, ensure_ascii=False)))
+                self.db.execute(
+                    "INSERT OR REPLACE INTO bodies(id, content_text, content_html) VALUES (?, ?, ?)",
+                    (i, it.get("content_text") or "", it.get("content_html") or ""))
+            for key in changed:
+                self._mark("month", key)
+            self._add_known(items)
+        return sorted(changed)
+
+    def delete(self, ids):
+        ids = list(ids)
+        changed = set()
+        with self.db:
+            for n in range(0, len(ids), 500):
+                chunk = ids[n:n + 500]
+                q = ",".join("?" * len(chunk))
+                changed.update(r[0] for r in self.db.execute(f"SELECT DISTINCT month FROM articles WHERE id IN ({q})", chunk))
+                self.db.execute(f"DELETE FROM articles WHERE id IN ({q})", chunk)
+            for key in changed:
+                self._mark("month", key)
+        return sorted(changed)
+
+    def prune(self, keep):
+        """只检查 has_fulltext = 0 的条目（走索引），其余条目必然保留。"""
+        before = self.db.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+        drop = [it["id"] for it in self.items_without_fulltext() if not keep(it)]
+        self.delete(drop)
+        with self.db:
+            self.db.execute("DELETE FROM known_ids")
+            self.db.execute("INSERT INTO known_ids(id) SELECT id FROM articles")
+            self._mark("dedup", "")
+        return before, before - len(drop)
+
+    # ---- 导出静态文件 ----
+    def export(self, all_months=False):
+        root = self.export_root
+        dirty = self.db.execute("SELECT kind, key FROM dirty").fetchall()
+        months = set(self.months()) if all_months else {k for (kind, k) in dirty if kind == "month"}
+        if all_months:
+            months |= {month_key(y, m) for (y, m) in iter_month_keys(root)}
+        for key in sorted(months):
+            arr = self.month_items(key)
+            path_y, path_m = _split(key)
+            if arr:
+                save_month(path_y, path_m, arr, root)
+            else:
+                remove_month(path_y, path_m, root)
+        if all_months or any(kind == "dedup" for (kind, _) in dirty):
+            save_dedup(self.known_ids(), root)
+        if root is None and (months or dirty):
+            write_index({m: n for (m, n) in self.db.execute("SELECT month, COUNT(*) FROM articles GROUP BY month")}, months)
+        with self.db:
+            self.db.execute("DELETE FROM dirty")
+        return sorted(months)
+
+    def flush(self, full_index=False):
+        return self.export()
+
+    def close(self):
+        self.db.close()
+
+    def import_json(self, root=None):
+        """从 JSON 布局整体导入（幂等）。"""
+        n = 0
+        for (y, m) in iter_month_keys(root):
+            arr = load_month(y, m, root)
+            self.put(arr)
+            n += len(arr)
+        self.add_known(load_dedup(root))
+        return n
+
+_stores = {}
+
+def get_store(root=None):
+    """root 为 None 时按 STORE_BACKEND 返回主存储；partial 目录总是 JSON。"""
+    key = root or ""
+    if key not in _stores:
+        _stores[key] = SqliteStore() if (root is None and STORE_BACKEND == "sqlite") else JsonStore(root)
+    return _stores[key]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m scripts.store")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("import", help="把 docs/data 导入 SQLite")
+    p_exp = sub.add_parser("export", help="从 SQLite 生成 docs/data 静态文件")
+    p_exp.add_argument("--all", action="store_true", help="重写全部月份")
+    sub.add_parser("stats", help="各月份条数 / 无全文条数")
+    args = ap.parse_args(argv)
+
+    db = SqliteStore()
+    if args.cmd == "import":
+        n = db.import_json()
+        print(f"[store] imported {n} items into {db.path}")
+    elif args.cmd == "export":
+        months = db.export(all_months=args.all)
+        print(f"[store] exported months: {', '.join(months) or '-'}")
+    else:
+        for (m, n, nf) in db.db.execute(
+                "SELECT month, COUNT(*), SUM(has_fulltext = 0) FROM articles GROUP BY month ORDER BY month"):
+            print(f"{m}: {n} (without fulltext: {nf})")
+    db.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
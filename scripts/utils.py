@@ -16,11 +16,24 @@ import re
 import time
 import hashlib
 import gzip
+import codecs
+import shutil
 from datetime import datetime, timezone, timedelta
-from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode, urljoin
-from dateutil import parser as dtparser
-import requests
-from bs4 import BeautifulSoup
+from urllib.parse import urljoin
+# requests / bs4 在用到的函数内导入：prune、index 等不联网、不解析 HTML 的命令不为它们付启动开销
+# 可选的快速 JSON 编解码器与 brotli，未安装时回退标准库 / 只写 .gz
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+if (os.getenv("JSON_CODEC") or "").strip().lower() == "stdlib":
+    _orjson = None
+try:
+    import brotli as _brotli
+except ImportError:
+    _brotli = None
+# 规范化/日期解析在 normalize 中实现（预编译 + 缓存），此处保留原有导入路径
+from scripts.normalize import TRACKING_PARAMS, domain_of, canonicalize_url, parse_datetime, to_iso
 
 # 数据目录与文件
 DATA_ROOT = os.path.join("docs", "data")
@@ -36,111 +49,356 @@ HEADERS = {
 
 RETRY_STATUS = {429, 500, 502, 503, 504}
 
-TRACKING_PARAMS = {
-    "utm_source", "utm_medium", "utm_campaign", "utm_term", "utm_content", "utm_id",
-    "mbid", "partner", "ncid", "cmpid", "icid", "ref", "refsrc", "oref", "_hsmi", "_hsenc",
-    "fbclid", "gclid", "smid", "emc", "share", "s_cid", "sref", "rss", "output", "mod",
-    "algo", "variant"
-}
+# 进程内共用的 requests.Session（连接池复用同一站点的 TCP/TLS 连接）
+_session = None
+
+# 单页 HTML 上限（可在 SOURCES 中按来源设置 max_html_bytes 覆盖）
+MAX_HTML_BYTES = int(os.getenv("MAX_HTML_BYTES") or 5 * 1024 * 1024)
+SNIFF_BYTES = 4096
+_CHARSET_RE = re.compile(r"charset=[\"']?([\w.:-]+)", re.I)
+_META_CHARSET_RE = re.compile(rb"<meta[^>]+charset=[\"']?([\w.:-]+)", re.I)
+
+# 大于该大小的前端数据文件额外写 .json.gz / .json.br
+PRECOMPRESS_MIN_BYTES = int(os.getenv("PRECOMPRESS_MIN_BYTES") or 32 * 1024)
+
+# 月份文件紧凑序列化后超过 MONTH_SPLIT_BYTES 时拆成按日分段的目录 YYYY/MM/（附 manifest.json），
+# 每段由连续的若干天组成，不超过 MONTH_SEGMENT_BYTES（单日超过时独占一段）；设为 0 关闭拆分
+MONTH_SPLIT_BYTES = int(os.getenv("MONTH_SPLIT_BYTES") or 4 * 1024 * 1024)
+MONTH_SEGMENT_BYTES = int(os.getenv("MONTH_SEGMENT_BYTES") or 1024 * 1024)
+MANIFEST_NAME = "manifest.json"
+STREAM_CHUNK_BYTES = 256 * 1024
+
+# 本进程的抓取统计（fetch_html）
+FETCH_STATS = {"pages": 0, "bytes_read": 0, "bytes_saved": 0, "rejected_type": 0, "rejected_size": 0, "not_modified": 0}
 
 def ensure_dir(p: str):
     os.makedirs(p, exist_ok=True)
 
+def dumps_json(obj, compact=False) -> bytes:
+    """序列化为 UTF-8 字节；装了 orjson（且未设 JSON_CODEC=stdlib）时使用 orjson。"""
+    if _orjson is not None:
+        return _orjson.dumps(obj, option=0 if compact else _orjson.OPT_INDENT_2)
+    if compact:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+def loads_json(data):
+    if _orjson is not None:
+        return _orjson.loads(data)
+    return json.loads(data)
+
 def load_json(path: str, default):
     if not os.path.exists(path):
         return default
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    with open(path, "rb") as f:
+        return loads_json(f.read())
 
-def save_json(path: str, obj):
+def _write_bytes(path: str, data: bytes):
     ensure_dir(os.path.dirname(path))
     tmp = path + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(obj, f, ensure_ascii=False, indent=2)
+    with open(tmp, "wb") as f:
+        f.write(data)
     os.replace(tmp, path)
 
+def save_json(path: str, obj, compact=False, precompress=False):
+    """
+    compact=True 用于只给程序/前端读的文件（无缩进）；
+    precompress=True 时对超过 PRECOMPRESS_MIN_BYTES 的文件同时写 .gz（及装了 brotli 时的 .br）。
+    """
+    data = dumps_json(obj, compact)
+    _write_bytes(path, data)
+    if precompress:
+        write_precompressed(path, data)
+
+def write_precompressed(path: str, data: bytes):
+    big = len(data) >= PRECOMPRESS_MIN_BYTES
+    # mtime=0 让相同内容得到相同的 .gz，避免无意义的提交
+    siblings = {".gz": (lambda b: gzip.compress(b, compresslevel=9, mtime=0))}
+    if _brotli is not None:
+        siblings[".br"] = lambda b: _brotli.compress(b, quality=11)
+    for ext, fn in siblings.items():
+        if big:
+            _write_bytes(path + ext, fn(data))
+        elif os.path.exists(path + ext):
+            os.remove(path + ext)
+
+def remove_with_siblings(path: str):
+    for p in (path, path + ".gz", path + ".br"):
+        if os.path.exists(p):
+            os.remove(p)
+
+def file_meta(path: str):
+    """index.json 中的文件描述：内容哈希、大小及预压缩文件大小。"""
+    with open(path, "rb") as f:
+        data = f.read()
+    meta = {"sha256": hashlib.sha256(data).hexdigest(), "bytes": len(data)}
+    for ext in (".gz", ".br"):
+        if os.path.exists(path + ext):
+            meta[ext[1:]] = os.path.getsize(path + ext)
+    return meta
+
 def sha1(s: str) -> str:
     return hashlib.sha1(s.encode("utf-8")).hexdigest()
 
-def domain_of(url: str) -> str:
-    try:
-        netloc = urlparse(url).netloc.lower()
-        return re.sub(r"^www\.", "", netloc)
-    except Exception:
-        return ""
+def monthly_file(year: int, month: int, root: str = None) -> str:
+    return os.path.join(root or DATA_ROOT, f"{year:04d}", f"{month:02d}.json")
 
-def canonicalize_url(u: str) -> str:
-    try:
-        parts = urlparse(u.strip())
-        scheme = "https"
-        netloc = re.sub(r"^(m|amp|www)\.", "", parts.netloc.lower())
-        path = re.sub(r"/+$", "", parts.path)
-        path = re.sub(r"/amp/?$", "", path).replace("/amp/", "/")
-        q = [(k, v) for (k, v) in parse_qsl(parts.query, keep_blank_values=True)
-             if k.lower() not in TRACKING_PARAMS and v.lower() != "amp"]
-        query = urlencode(q, doseq=True)
-        return urlunparse((scheme, netloc, path, "", query, ""))
-    except Exception:
-        return u
+def month_dir(year: int, month: int, root: str = None) -> str:
+    """分段月份的目录：YYYY/MM/（manifest.json + 各段文件）。"""
+    return os.path.join(root or DATA_ROOT, f"{year:04d}", f"{month:02d}")
+
+def manifest_file(year: int, month: int, root: str = None) -> str:
+    return os.path.join(month_dir(year, month, root), MANIFEST_NAME)
 
-def to_iso(dt) -> str:
-    if isinstance(dt, str):
-        dt = dtparser.parse(dt)
-    if dt.tzinfo is None:
-        dt = dt.replace(tzinfo=timezone.utc)
-    return dt.astimezone(timezone.utc).isoformat()
+def load_manifest(year: int, month: int, root: str = None):
+    """分段月份返回 manifest，否则返回 None。"""
+    return load_json(manifest_file(year, month, root), None)
 
-def monthly_file(year: int, month: int) -> str:
-    return os.path.join(DATA_ROOT, f"{year:04d}", f"{month:02d}.json")
+def month_of(item):
+    dt = parse_datetime(item["published_at"])
+    return dt.year, dt.month
 
-def load_month(year: int, month: int):
-    path = monthly_file(year, month)
+def month_key(year: int, month: int) -> str:
+    return f"{year:04d}-{month:02d}"
+
+def iter_month_keys(root: str = None):
+    """按时间顺序列出 root 下已有的月份 (year, month)。"""
+    root = root or DATA_ROOT
+    if not os.path.isdir(root):
+        return
+    for y in sorted(os.listdir(root)):
+        ydir = os.path.join(root, y)
+        if not (y.isdigit() and os.path.isdir(ydir)):
+            continue
+        months = set()
+        for m in os.listdir(ydir):
+            if m.endswith(".json") and m[:-5].isdigit():
+                months.add(int(m[:-5]))
+            elif m.isdigit() and os.path.exists(os.path.join(ydir, m, MANIFEST_NAME)):
+                months.add(int(m))
+        for m in sorted(months):
+            yield int(y), m
+
+def iter_json_array(path: str, chunk_bytes: int = STREAM_CHUNK_BYTES):
+    """逐个产出 JSON 数组文件中的元素（对象），内存只保留当前读取窗口。"""
+    dec = json.JSONDecoder()
+    with open(path, "rb") as f:
+        reader = codecs.getincrementaldecoder("utf-8")()
+        buf, pos, eof, started = "", 0, False, False
+        while True:
+            # 跳过分隔符；窗口内没有完整元素时再读一块
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if not started and pos < len(buf):
+                if buf[pos] != "[":
+                    raise ValueError(f"not a JSON array: {path}")
+                started, pos = True, pos + 1
+                continue
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            try:
+                if pos >= len(buf):
+                    raise ValueError("need more data")
+                obj, end = dec.raw_decode(buf, pos)
+            except ValueError:
+                if eof:
+                    raise ValueError(f"truncated JSON array: {path}")
+                chunk = f.read(chunk_bytes)
+                eof = not chunk
+                buf = buf[pos:] + reader.decode(chunk, final=eof)
+                pos = 0
+                continue
+            yield obj
+            pos = end
+
+def iter_month(year: int, month: int, root: str = None):
+    """
+    按新到旧流式产出某月的条目：分段月份逐段读取，单文件月份增量解析，
+    内存占用与月份大小无关（供 prune / 统计 / 导入等批处理使用）。
+    """
+    manifest = load_manifest(year, month, root)
+    if manifest is not None:
+        d = month_dir(year, month, root)
+        for seg in manifest.get("segments") or []:
+            yield from load_json(os.path.join(d, seg["file"]), [])
+        return
+    path = monthly_file(year, month, root)
+    if os.path.exists(path):
+        yield from iter_json_array(path)
+
+def load_month(year: int, month: int, root: str = None):
+    manifest = load_manifest(year, month, root)
+    if manifest is not None:
+        return list(iter_month(year, month, root))
+    path = monthly_file(year, month, root)
     if not os.path.exists(path):
         return []
     return load_json(path, [])
 
-def save_month(year: int, month: int, items):
-    path = monthly_file(year, month)
-    items_sorted = sorted(items, key=lambda x: x.get("published_at", ""), reverse=True)
-    save_json(path, items_sorted)
-
-def load_dedup():
-    return set(load_json(DEDUP_FILE, []))
+def month_count(year: int, month: int, root: str = None):
+    """月份条数；分段月份直接读 manifest。"""
+    manifest = load_manifest(year, month, root)
+    if manifest is not None:
+        return int(manifest.get("count") or 0)
+    return sum(1 for _ in iter_month(year, month, root))
 
-def save_dedup(s):
-    save_json(DEDUP_FILE, sorted(list(s)))
+def _write_if_changed(path: str, data: bytes, precompress: bool):
+    """内容未变时不重写（分段月份追加新条目时只有最新的段变化，其余段保持不动）。"""
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+    except OSError:
+        pass
+    _write_bytes(path, data)
+    if precompress:
+        write_precompressed(path, data)
+    return True
 
-def update_index_indexfile():
-    months = {}
+def _day_of(item):
+    return parse_datetime(item["published_at"]).day
+
+def _plan_segments(items_sorted):
+    """
+    按天从月初往后累积，超过 MONTH_SEGMENT_BYTES 就另起一段；
+    新条目通常落在最近几天，只影响最后一段，前面各段的边界与内容不变。
+    返回 [(起始日, 结束日, 条目)]，按新到旧排列。
+    """
+    days = {}
+    for it in items_sorted:
+        days.setdefault(_day_of(it), []).append(it)
+    segments, cur, cur_bytes = [], None, 0
+    for day in sorted(days):
+        size = len(dumps_json(days[day], compact=True))
+        if cur is not None and cur_bytes + size > MONTH_SEGMENT_BYTES:
+            segments.append(cur)
+            cur = None
+        if cur is None:
+            cur, cur_bytes = [day, day, []], 0
+        cur[1] = day
+        cur[2].extend(days[day])
+        cur_bytes += size
+    if cur is not None:
+        segments.append(cur)
+    return [(lo, hi, sorted(arr, key=_sort_key, reverse=True)) for lo, hi, arr in reversed(segments)]
+
+def _sort_key(x):
+    return (x.get("published_at", ""), x.get("id", ""))
+
+def _save_segmented(year, month, items_sorted, root, precompress):
+    d = month_dir(year, month, root)
+    ensure_dir(d)
+    segments, keep = [], {MANIFEST_NAME}
+    for lo, hi, arr in _plan_segments(items_sorted):
+        name = f"{lo:02d}-{hi:02d}.json"
+        path = os.path.join(d, name)
+        _write_if_changed(path, dumps_json(arr, compact=True), precompress)
+        keep.update(name + ext for ext in ("", ".gz", ".br"))
+        segments.append(dict(file_meta(path), file=name, first=f"{year:04d}-{month:02d}-{lo:02d}",
+                             last=f"{year:04d}-{month:02d}-{hi:02d}", count=len(arr)))
+    # 边界变化后不再使用的段
+    for name in os.listdir(d):
+        if name not in keep:
+            os.remove(os.path.join(d, name))
+    manifest = {
+        "month": month_key(year, month),
+        "count": len(items_sorted),
+        "sources": sorted({it.get("source") or "" for it in items_sorted} - {""}),
+        "segments": segments,
+    }
+    _write_if_changed(manifest_file(year, month, root), dumps_json(manifest, compact=True), False)
+    remove_with_siblings(monthly_file(year, month, root))
+
+def save_month(year: int, month: int, items, root: str = None):
+    path = monthly_file(year, month, root)
+    # 同一发布时间按 id 排序，保证输出确定
+    items_sorted = sorted(items, key=_sort_key, reverse=True)
+    # 月份文件只给前端读：紧凑输出，主目录下同时写预压缩文件
+    data = dumps_json(items_sorted, compact=True)
+    if MONTH_SPLIT_BYTES and len(data) > MONTH_SPLIT_BYTES:
+        _save_segmented(year, month, items_sorted, root, precompress=root is None)
+        return
+    _write_if_changed(path, data, precompress=root is None)
+    # 月份缩小到阈值以下时回到单文件
+    if os.path.isdir(month_dir(year, month, root)):
+        shutil.rmtree(month_dir(year, month, root))
+
+def remove_month(year: int, month: int, root: str = None):
+    """删除某月的数据文件（单文件或分段目录）。"""
+    remove_with_siblings(monthly_file(year, month, root))
+    if os.path.isdir(month_dir(year, month, root)):
+        shutil.rmtree(month_dir(year, month, root))
+
+def load_dedup(root: str = None):
+    return set(load_json(os.path.join(root or DATA_ROOT, "dedup.json"), []))
+
+def save_dedup(s, root: str = None):
+    save_json(os.path.join(root or DATA_ROOT, "dedup.json"), sorted(list(s)), compact=True)
+
+def update_index_indexfile(months=None):
+    """
+    重建 index.json。months 为 "YYYY-MM" 列表时只重新统计这些月份，
+    其余月份沿用现有 index 中的计数。
+    """
     ensure_dir(DATA_ROOT)
-    for y in sorted(os.listdir(DATA_ROOT)):
-        ydir = os.path.join(DATA_ROOT, y)
-        if not os.path.isdir(ydir):
-            continue
-        for m in sorted(os.listdir(ydir)):
-            if not m.endswith(".json"):
-                continue
-            path = os.path.join(ydir, m)
-            try:
-                data = load_json(path, [])
-                months[f"{y}-{m[:-5]}"] = len(data)
-            except Exception:
-                pass
+    old = load_json(INDEX_FILE, {}) if months is not None else {}
+    counts = dict(old.get("counts") or {})
+    if months is None:
+        keys = [month_key(y, m) for (y, m) in iter_month_keys()]
+    else:
+        keys = sorted(set(months))
+    for key in keys:
+        y, m = int(key[:4]), int(key[5:])
+        try:
+            if os.path.exists(monthly_file(y, m)) or os.path.exists(manifest_file(y, m)):
+                counts[key] = month_count(y, m)
+            else:
+                counts.pop(key, None)
+        except Exception:
+            pass
+    write_index(counts, keys)
+
+def write_index(counts, refresh=()):
+    """
+    按 {"YYYY-MM": 条数} 写 index.json。files 中记录每个月份文件的内容哈希与（预压缩）大小，
+    前端据此选择 .gz 并做缓存失效；只重新计算 refresh 中的月份。
+    分段月份记录的是 manifest.json 的哈希，另加 segments（段数），前端据此按需逐段加载。
+    """
+    old_files = (load_json(INDEX_FILE, {}) or {}).get("files") or {}
+    files = {}
+    for key in sorted(counts.keys()):
+        y, m = int(key[:4]), int(key[5:])
+        path = monthly_file(y, m)
+        if key in old_files and key not in refresh:
+            files[key] = old_files[key]
+        elif os.path.exists(manifest_file(y, m)):
+            manifest = load_manifest(y, m)
+            files[key] = dict(file_meta(manifest_file(y, m)), segments=len(manifest.get("segments") or []))
+        elif os.path.exists(path):
+            files[key] = file_meta(path)
     index = {
-        "months": sorted(months.keys()),
-        "counts": months,
+        "months": sorted(counts.keys()),
+        "counts": {k: counts[k] for k in sorted(counts.keys())},
+        "files": files,
         "generated_at": to_iso(datetime.now(timezone.utc)),
     }
     save_json(INDEX_FILE, index)
 
-def add_item_if_new(dedup_set, item):
+def add_item_if_new(dedup_set, item, root: str = None, fp_index=None):
+    """
+    新条目只追加到入库日志（scripts.journal），月份文件由 compact 批量重写。
+    传入 fp_index 时按近重复策略（scripts.neardup）关联或丢弃转载稿。
+    """
+    from scripts.journal import append_item
     if item["id"] in dedup_set:
         return False
-    dt = dtparser.parse(item["published_at"])
-    y, m = dt.year, dt.month
-    arr = load_month(y, m)
-    arr.append(item)
-    save_month(y, m, arr)
+    month_of(item)  # 发布时间无法解析时在入库前报错
+    if fp_index is not None:
+        from scripts.neardup import apply_policy
+        if not apply_policy(fp_index, item):
+            dedup_set.add(item["id"])
+            return False
+    append_item(item, root)
     dedup_set.add(item["id"])
     return True
 
@@ -162,7 +420,18 @@ def make_item(url, title, source, published_at_iso, summary=None, author=None, u
         "can_publish_fulltext": False,
     }
 
-def http_get(url, headers=None, timeout=25, max_retries=3, backoff=1.6):
+def http_session():
+    """进程内共用的 Session；python -m scripts run-all 的各阶段也共用它。"""
+    global _session
+    if _session is None:
+        import requests
+        from http.cookiejar import DefaultCookiePolicy
+        _session = requests.Session()
+        # 与逐次 requests.get 一致：不跨请求保留 Cookie（避免计次付费墙在运行中途生效）
+        _session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return _session
+
+def http_get(url, headers=None, timeout=25, max_retries=3, backoff=1.6, stream=False):
     h = dict(HEADERS)
     if headers:
         h.update(headers)
@@ -170,8 +439,9 @@ def http_get(url, headers=None, timeout=25, max_retries=3, backoff=1.6):
     delay = 1.0
     for attempt in range(max_retries + 1):
         try:
-            r = requests.get(url, headers=h, timeout=timeout)
+            r = http_session().get(url, headers=h, timeout=timeout, stream=stream)
             if r.status_code in RETRY_STATUS:
+                r.close()
                 ra = r.headers.get("Retry-After")
                 if ra:
                     try:
@@ -194,6 +464,89 @@ def http_get(url, headers=None, timeout=25, max_retries=3, backoff=1.6):
                 continue
             raise last_exc
 
+def source_conf_for(url: str):
+    """按域名找到 SOURCES 中对应的来源配置（含子域名），找不到返回 {}。"""
+    from scripts.config import SOURCES
+    d = domain_of(url)
+    for conf in SOURCES.values():
+        dom = conf.get("domain") or ""
+        if dom and (d == dom or d.endswith("." + dom)):
+            return conf
+    return {}
+
+def _charset_from_content_type(ctype: str):
+    m = _CHARSET_RE.search(ctype or "")
+    return m.group(1) if m else None
+
+def _sniff_charset(head: bytes):
+    if head.startswith(b"\xef\xbb\xbf"):
+        return "utf-8"
+    m = _META_CHARSET_RE.search(head)
+    return m.group(1).decode("ascii", "ignore") if m else None
+
+def _valid_codec(name):
+    try:
+        return codecs.lookup(name).name if name else None
+    except LookupError:
+        return None
+
+def fetch_html(url, timeout=25, max_bytes=None, headers=None):
+    """
+    流式抓取 HTML：先看状态码与 Content-Type，非 HTML 直接断开；
+    正文超过 max_bytes（默认按来源 max_html_bytes / MAX_HTML_BYTES）即放弃；
+    编码取自响应头 charset，其次是前 SNIFF_BYTES 字节中的 <meta charset>，最后 utf-8。
+    带条件请求头（If-None-Match / If-Modified-Since）时，304 返回 (None, response)。
+    返回 (html 文本或 None, response)；节省的流量计入 FETCH_STATS。
+    """
+    h = {"Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"}
+    h.update(headers or {})
+    r = http_get(url, headers=h, timeout=timeout, stream=True)
+    try:
+        FETCH_STATS["pages"] += 1
+        if r.status_code == 304:
+            FETCH_STATS["not_modified"] += 1
+            return None, r
+        ctype = r.headers.get("Content-Type", "").lower()
+        try:
+            clen = int(r.headers.get("Content-Length") or 0)
+        except ValueError:
+            clen = 0
+        if "text/html" not in ctype:
+            FETCH_STATS["rejected_type"] += 1
+            FETCH_STATS["bytes_saved"] += clen
+            return None, r
+        limit = max_bytes or source_conf_for(url).get("max_html_bytes") or MAX_HTML_BYTES
+        if clen > limit:
+            FETCH_STATS["rejected_size"] += 1
+            FETCH_STATS["bytes_saved"] += clen
+            return None, r
+        buf = bytearray()
+        for chunk in r.iter_content(chunk_size=64 * 1024):
+            buf += chunk
+            if len(buf) > limit:
+                FETCH_STATS["rejected_size"] += 1
+                FETCH_STATS["bytes_read"] += len(buf)
+                FETCH_STATS["bytes_saved"] += max(clen - len(buf), 0)
+                return None, r
+        FETCH_STATS["bytes_read"] += len(buf)
+        enc = (_valid_codec(_charset_from_content_type(ctype))
+               or _valid_codec(_sniff_charset(bytes(buf[:SNIFF_BYTES])))
+               or "utf-8")
+        return bytes(buf).decode(enc, errors="replace"), r
+    finally:
+        r.close()
+
+def reset_fetch_stats():
+    """清零 FETCH_STATS（就地修改，已 import 它的模块看到的是同一个字典）。"""
+    for k in FETCH_STATS:
+        FETCH_STATS[k] = 0
+
+def report_fetch_stats(prefix="[fetch]"):
+    st = FETCH_STATS
+    print(f"{prefix} pages={st['pages']} read={st['bytes_read'] / 1e6:.1f}MB "
+          f"saved>={st['bytes_saved'] / 1e6:.1f}MB rejected(type)={st['rejected_type']} rejected(size)={st['rejected_size']} "
+          f"not_modified={st['not_modified']}")
+
 def parse_xml(content_bytes: bytes) -> str:
     data = content_bytes
     if content_bytes[:2] == b"\x1f\x8b":
@@ -250,6 +603,7 @@ def _from_ld_json(soup):
     return (authors, published, modified)
 
 def extract_meta_from_html(html_text: str):
+    from bs4 import BeautifulSoup
     soup = BeautifulSoup(html_text, "html.parser")
     title = _first_meta(soup, props=["og:title", "twitter:title"]) or (
         soup.title.string.strip() if soup.title and soup.title.string else None
@@ -275,14 +629,15 @@ def extract_meta_from_html(html_text: str):
 
 def extract_meta(url: str, timeout=18):
     try:
-        r = http_get(url, headers={"Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"}, timeout=timeout)
-        if "text/html" not in r.headers.get("Content-Type", "").lower():
+        html_text, _ = fetch_html(url, timeout=timeout)
+        if html_text is None:
             return {}
-        return extract_meta_from_html(r.text)
+        return extract_meta_from_html(html_text)
     except Exception:
         return {}
 
 def transform_content_html(html_text: str, base_url: str) -> str:
+    from bs4 import BeautifulSoup
     soup = BeautifulSoup(html_text or "", "html.parser")
     for t in soup(["script", "style", "noscript", "iframe"]):
         t.decompose()
@@ -328,8 +683,9 @@ def transform_content_html(html_text: str, base_url: str) -> str:
 
 def collect_from_sitemap_index(base_url, start_iso, end_iso, polite_delay=0.6, include_no_lastmod=True):
     from xml.etree import ElementTree as ET
-    start = dtparser.parse(start_iso)
-    end = dtparser.parse(end_iso)
+    from bs4 import BeautifulSoup
+    start = parse_datetime(start_iso)
+    end = parse_datetime(end_iso)
 
     try:
         idx_resp = http_get(base_url, timeout=40)
@@ -357,7 +713,7 @@ def collect_from_sitemap_index(base_url, start_iso, end_iso, polite_delay=0.6, i
             loc = loc_el.text.strip()
             if lm_el is not None and lm_el.text:
                 try:
-                    lm = dtparser.parse(lm_el.text.strip())
+                    lm = parse_datetime(lm_el.text.strip())
                     if lm < (start - timedelta(days=40)) or lm > (end + timedelta(days=40)):
                         continue
                 except Exception:
@@ -396,7 +752,7 @@ def collect_from_sitemap_index(base_url, start_iso, end_iso, polite_delay=0.6, i
             used_dt = None
             if lm_el is not None and lm_el.text:
                 try:
-                    dtv = dtparser.parse(lm_el.text.strip())
+                    dtv = parse_datetime(lm_el.text.strip())
                     if start <= dtv <= end:
                         used_dt = dtv
                 except Exception:
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+work_queue.py
+日更任务的限时优先级调度：
+- 工作单元：rss:<feed url>、sitemap:<来源 key>、github:<owner>/<repo>
+- 每个单元记录历次运行的新增条数与耗时（EWMA），按“预期新增条数/秒”从高到低派发；
+  没有历史的单元排在有历史的单元之前（先探测一次）
+- 全局时间预算 TIME_BUDGET_MIN_DAILY（分钟）+ 余量 TIME_HEADROOM_SEC_DAILY（秒）：
+  剩余时间不足余量或不够跑完某个单元的预期耗时，就不再派发该单元；
+  余量至少是上次收尾（journal compact / 指纹 / 轮询计划落盘）耗时的 FLUSH_SAFETY 倍
+- 没来得及跑（或跑到一半因超时中断）的单元记为 deferred，下次运行排在最前
+- 状态保存在 docs/data/run_stats.json
+"""
+import os, time, bisect
+from scripts.utils import DATA_ROOT, load_json, save_json, to_iso
+
+RUN_STATS_NAME = "run_stats.json"
+EWMA_ALPHA = 0.3
+FLUSH_SAFETY = 2.0
+
+class Deadline:
+    """budget_sec 为 None 时不限时；t0 为计时起点（默认现在）。"""
+    def __init__(self, budget_sec=None, headroom_sec=0.0, t0=None):
+        self.t0 = time.time() if t0 is None else t0
+        self.budget = budget_sec
+        self.headroom = headroom_sec
+
+    def elapsed(self):
+        return time.time() - self.t0
+
+    def remaining(self):
+        return float("inf") if self.budget is None else self.budget - self.elapsed()
+
+    def expired(self):
+        return self.remaining() <= self.headroom
+
+    def fits(self, est_secs):
+        return self.remaining() - self.headroom >= (est_secs or 0.0)
+
+def deadline_from_env(stats=None, suffix="_DAILY", t0=None):
+    minutes = float(os.getenv("TIME_BUDGET_MIN" + suffix) or 0)
+    headroom = float(os.getenv("TIME_HEADROOM_SEC" + suffix) or 70)
+    headroom = max(headroom, FLUSH_SAFETY * float((stats or {}).get("flush_secs") or 0.0))
+    return Deadline(minutes * 60 if minutes > 0 else None, headroom, t0)
+
+def stats_path(root=None):
+    return os.path.join(root or DATA_ROOT, RUN_STATS_NAME)
+
+def load_stats(root=None):
+    stats = load_json(stats_path(root), {})
+    stats.setdefault("units", {})
+    stats.setdefault("deferred", [])
+    return stats
+
+def save_stats(stats, root=None):
+    out = dict(stats)
+    out["units"] = {k: stats["units"][k] for k in sorted(stats["units"])}
+    save_json(stats_path(root), out)
+
+def unit_rate(stats, uid):
+    """预期新增条数/秒；没有历史时返回 None。"""
+    rec = stats["units"].get(uid)
+    return None if not rec else float(rec.get("rate") or 0.0)
+
+def expected_secs(stats, uid):
+    rec = stats["units"].get(uid)
+    return None if not rec else float(rec.get("secs") or 0.0)
+
+def _priority(stats, uid, carried):
+    if uid in carried:
+        return (0, carried[uid], uid)
+    rate = unit_rate(stats, uid)
+    return (1, float("-inf") if rate is None else -rate, uid)
+
+def record_unit(stats, uid, items, secs, now, complete=True):
+    rec = stats["units"].setdefault(uid, {"runs": 0})
+    rate = items / max(secs, 0.001)
+    if rec["runs"]:
+        rec["rate"] = round(EWMA_ALPHA * rate + (1 - EWMA_ALPHA) * float(rec.get("rate") or 0.0), 6)
+        # 中断的运行只跑了一部分，不用来更新耗时估计
+        if complete:
+            rec["secs"] = round(EWMA_ALPHA * secs + (1 - EWMA_ALPHA) * float(rec.get("secs") or 0.0), 2)
+    else:
+        rec["rate"] = round(rate, 6)
+        rec["secs"] = round(secs, 2)
+    rec["runs"] += 1
+    rec["last_items"] = items
+    rec["last_run"] = to_iso(now)
+    return rec
+
+def drain(units, run, deadline, stats, now, follow_up=None):
+    """
+    按优先级派发 units；run(uid) 返回 (新增条数, 是否完整跑完)。
+    follow_up(uid) 返回该单元完成后才具备条件的新单元（如 RSS 全部跑完后的 Sitemap 兜底）。
+    返回 (已运行 [(uid, 新增, 秒)], 推迟的 uid 列表)；推迟列表同时写回 stats["deferred"]。
+    """
+    carried = {u: i for i, u in enumerate(stats.get("deferred") or [])}
+    pending = sorted((_priority(stats, u, carried), u) for u in dict.fromkeys(units))
+    done, deferred = [], []
+    while pending:
+        _, uid = pending.pop(0)
+        # 上次推迟的单元只要没到余量就派发（否则预期耗时超过整个预算的单元会一直饿死），超时由单元内部中断
+        if deadline.expired() or (uid not in carried and not deadline.fits(expected_secs(stats, uid))):
+            deferred.append(uid)
+            continue
+        t0 = time.time()
+        items, complete = run(uid)
+        secs = time.time() - t0
+        record_unit(stats, uid, items, secs, now, complete)
+        done.append((uid, items, secs))
+        if not complete:
+            deferred.append(uid)
+            continue
+        for extra in (follow_up(uid) if follow_up else ()):
+            bisect.insort(pending, (_priority(stats, extra, carried), extra))
+    stats["deferred"] = deferred
+    return done, deferred
+
+def shard_stats(stats, owned):
+    """分片 worker 只保存自己负责的单元；owned 供合并时替换主目录中这些单元的推迟记录。"""
+    return {
+        "units": {u: r for u, r in stats["units"].items() if u in owned},
+        "deferred": list(stats["deferred"]),
+        "owned": sorted(owned),
+        "flush_secs": stats.get("flush_secs", 0.0),
+    }
+
+def merge_stats(base, parts):
+    """把各分片的 run_stats 合并进主目录的 run_stats（各分片单元互不重叠）。"""
+    owned = set()
+    for p in parts:
+        owned.update(p.get("owned") or p["units"])
+    out = dict(base, units=dict(base["units"]))
+    out["deferred"] = [u for u in base["deferred"] if u not in owned]
+    for p in parts:
+        out["units"].update(p["units"])
+        out["deferred"] += [u for u in p["deferred"] if u not in out["deferred"]]
+    out["flush_secs"] = max([float(base.get("flush_secs") or 0.0)] + [float(p.get("flush_secs") or 0.0) for p in parts])
+    return out
+
+def report(done, deferred, deadline, stats):
+    budget = "-" if deadline.budget is None else f"{deadline.budget:.0f}s"
+    print(f"[queue] ran={len(done)} deferred={len(deferred)} elapsed={deadline.elapsed():.0f}s "
+          f"budget={budget} headroom={deadline.headroom:.0f}s")
+    for (uid, items, secs) in done:
+        print(f"  {items:>4} in {secs:6.1f}s  {uid}")
+    for uid in deferred:
+        rate, est = unit_rate(stats, uid), expected_secs(stats, uid)
+        hint = "no history" if rate is None else f"~{rate * 3600:.1f}/h, ~{est:.0f}s"
+        print(f"  deferred ({hint})  {uid}")